@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+"""
+Measures the cost of matching client addresses against addresses and address
+ranges (as Monitor.matches does) using Radar's Address and AddressRange and
+a copy of their previous implementation (which compiled a regexp and built
+temporary objects on every comparison).
+
+Usage : python benchmarks/address.py [LOOKUPS]
+"""
+
+
+from os.path import abspath, dirname
+from sys import argv, path
+from re import compile as compile_re
+from timeit import timeit
+
+# Radar is imported from this checkout, so the benchmark can be run from
+# anywhere without installing it.
+path.insert(0, dirname(dirname(abspath(__file__))))
+
+from radar.misc import Address, AddressRange
+
+
+class LegacyAddress(object):
+    def __init__(self, address):
+        self.ip = self._validate(address.strip())
+        self.n = self._to_int()
+
+    def _validate(self, address):
+        regexp = compile_re(r'(\d{1,3}\.){3}\d{1,3}')
+
+        if not regexp.match(address) or not all([int(octet) <= 255 for octet in address.split('.', 3)]):
+            raise ValueError(address)
+
+        return address
+
+    def _to_int(self):
+        octets = [int(octet) for octet in self.ip.split('.', 3)]
+        return sum([byte * pow(256, n) for n, byte in enumerate(reversed(octets))])
+
+    def __eq__(self, other_address):
+        if type(other_address) == LegacyAddress:
+            return self.n == other_address.n
+
+        return self.n == LegacyAddress(other_address).n
+
+    def __contains__(self, address):
+        return self.__eq__(address)
+
+
+class LegacyAddressRange(object):
+    def __init__(self, address_range):
+        self.start_ip, self.end_ip = [LegacyAddress(a) for a in address_range.split('-', 1)]
+
+    def __contains__(self, address):
+        if type(address) == LegacyAddress:
+            return self.start_ip.n <= address.n <= self.end_ip.n
+
+        return self.start_ip.n <= LegacyAddress(address).n <= self.end_ip.n
+
+
+def run(name, address_class, address_range_class, lookups):
+    addresses = [address_class('10.0.0.1'), address_range_class('192.168.0.1 - 192.168.255.254')]
+    clients = ['192.168.{:}.{:}'.format(i % 256, i % 250 + 1) for i in range(1000)]
+    statement = lambda: [any([c in a for a in addresses]) for c in clients]
+    elapsed = timeit(statement, number=lookups // len(clients))
+    print('{:<10} {:>10} lookups : {:.3f} secs.'.format(name, lookups, elapsed))
+    return elapsed
+
+
+if __name__ == '__main__':
+    lookups = int(argv[1]) if len(argv) > 1 else 10 ** 6
+    legacy = run('Legacy', LegacyAddress, LegacyAddressRange, lookups)
+    current = run('Current', Address, AddressRange, lookups)
+    print('Speedup : {:.1f}x'.format(legacy / current))
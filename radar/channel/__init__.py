@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from errno import EAGAIN, EWOULDBLOCK, EINTR
+from queue import Queue, Empty as EmptyQueue
+from threading import Lock
+import socket
+
+
+class ChannelError(Exception):
+    pass
+
+
+class ChannelClosed(Exception):
+    pass
+
+
+class Channel(object):
+    """
+    A channel hands items from one thread to another. Readers block until
+    an item arrives or the channel is closed (instead of periodically
+    polling a queue), so a hand-off costs no extra latency and idle threads
+    never wake up. When notify is set (and the platform supports socket
+    pairs) every write also makes the channel readable, so it can be watched
+    by select & friends along with any other socket.
+    """
+
+    _CLOSED = object()
+    NOTIFY_BUFFER_SIZE = 4096
+
+    def __init__(self, notify=False):
+        self._queue = Queue()
+        self._closed = False
+        self._lock = Lock()
+        self._reader, self._writer = self._build_notifier() if notify else (None, None)
+
+    def _build_notifier(self):
+        try:
+            reader, writer = socket.socketpair()
+        except (AttributeError, socket.error):
+            return None, None
+
+        reader.setblocking(0)
+        writer.setblocking(0)
+
+        return reader, writer
+
+    def can_notify(self):
+        return self._reader is not None
+
+    def fileno(self):
+        if not self.can_notify():
+            raise ChannelError('Error - Channel can\'t be watched on this platform.')
+
+        return self._reader.fileno()
+
+    # A single pending byte is enough to wake up a reader, so a full notifier
+    # buffer is not an error.
+    def _notify(self):
+        if self._writer is None:
+            return
+
+        try:
+            self._writer.send(b'\0')
+        except socket.error as e:
+            if e.args[0] not in [EAGAIN, EWOULDBLOCK, EINTR]:
+                raise ChannelError('Error - Couldn\'t notify channel reader. Details : {:}.'.format(e))
+
+    def _clear_notifications(self):
+        try:
+            while self._reader.recv(self.NOTIFY_BUFFER_SIZE):
+                pass
+        except socket.error:
+            pass
+
+    # Items written after the channel is closed are discarded, nobody is
+    # going to read them.
+    def put(self, item):
+        if not self._closed:
+            self._queue.put(item)
+            self._notify()
+
+    def put_nowait(self, item):
+        self.put(item)
+
+    # The close mark is put back so every reader blocked on the channel
+    # gets to see it.
+    def _check_closed(self, item):
+        if item is self._CLOSED:
+            self._queue.put(item)
+            raise ChannelClosed()
+
+        return item
+
+    def get(self, block=True, timeout=None):
+        return self._check_closed(self._queue.get(block=block, timeout=timeout))
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    # Returns every item written so far without blocking. Notifications are
+    # cleared before reading the items, so an item written in between always
+    # leaves the channel readable.
+    def drain(self):
+        items = []
+
+        if self.can_notify():
+            self._clear_notifications()
+
+        try:
+            while True:
+                items.append(self.get_nowait())
+        except (EmptyQueue, ChannelClosed):
+            pass
+
+        return items
+
+    def empty(self):
+        return self._queue.empty()
+
+    def is_closed(self):
+        return self._closed
+
+    # Pending items are still delivered, readers only get ChannelClosed once
+    # they reach the close mark.
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+
+            self._closed = True
+
+        self._queue.put(self._CLOSED)
+        self._notify()
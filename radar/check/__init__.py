@@ -20,13 +20,15 @@ Copyright 2015 Lucas Liendo.
 """
 
 
-from future.utils import listitems
+from future.utils import listitems, PY2
+from collections import namedtuple
 from functools import reduce
 from json import loads as deserialize_json
 from os import stat
 from os.path import join as join_path, isabs as is_absolute_path
 from shlex import split as split_args
 from subprocess import Popen, PIPE
+from threading import Timer, Event
 from ..misc import Switchable
 
 
@@ -34,11 +36,78 @@ class CheckError(Exception):
     pass
 
 
+class CheckTimeoutError(CheckError):
+    pass
+
+
 class CheckGroupError(Exception):
     pass
 
 
-class Check(Switchable):
+# Mixin used by checks and check groups to hold their (optional) polling
+# interval and jitter. If no interval is set the server's polling time applies.
+class Schedulable(object):
+
+    ScheduleError = CheckError
+
+    def __init__(self, interval=None, jitter=0):
+        self.interval = self._validate_interval(interval)
+        self.jitter = self._validate_jitter(jitter)
+
+    def _validate_interval(self, interval):
+        try:
+            if interval is not None and float(interval) < 1:
+                raise self.ScheduleError('Error - Polling interval must be greater than 1 sec.')
+        except (TypeError, ValueError):
+            raise self.ScheduleError('Error - \'{:}\' is not a valid polling interval.'.format(interval))
+
+        return float(interval) if interval is not None else None
+
+    def _validate_jitter(self, jitter):
+        try:
+            if float(jitter) < 0:
+                raise self.ScheduleError('Error - Polling jitter must be a positive value.')
+        except (TypeError, ValueError):
+            raise self.ScheduleError('Error - \'{:}\' is not a valid polling jitter.'.format(jitter))
+
+        return float(jitter)
+
+
+# Shared by checks and per client check states.
+def _update_status(check, check_status):
+    updated = False
+
+    try:
+        if check._update_matches(check_status):
+            check.previous_status = check.current_status
+            check.current_status = check_status['status']
+            check.details = check_status.get('details', '')
+            check.data = check_status.get('data', None)
+            updated = True
+    except KeyError:
+        raise CheckError('Error - Can\'t update check\'s status. Missing id and/or status from check reply.')
+
+    return updated
+
+
+class CheckSnapshot(namedtuple('CheckSnapshot', [
+        'id', 'name', 'path', 'args', 'current_status', 'previous_status', 'details', 'data', 'enabled'])):
+    """
+    Immutable copy of a check (or of a per client check state) taken right
+    after a reply updates it. Later updates never change a snapshot, so it
+    can be safely handed to other threads or processes.
+    """
+
+    __slots__ = ()
+
+    def to_dict(self):
+        return dict(zip(self._fields, self))
+
+    def as_list(self):
+        return [self]
+
+
+class Check(Switchable, Schedulable):
 
     STATUS = {
         'ERROR': -1,
@@ -49,8 +118,13 @@ class Check(Switchable):
         'TIMEOUT': 4,
     }
 
-    def __init__(self, id=None, name='', path='', args='', details='', data=None, enabled=True, platform_setup=None):
-        super(Check, self).__init__(id=id, enabled=enabled)
+    STATUS_VALUES = frozenset(STATUS.values())
+    STATUS_NAMES = dict(zip(STATUS.values(), STATUS.keys()))
+
+    def __init__(self, id=None, name='', path='', args='', details='', data=None, timeout=None, interval=None,
+                 jitter=0, enabled=True, platform_setup=None):
+        Switchable.__init__(self, id=id, enabled=enabled)
+        Schedulable.__init__(self, interval=interval, jitter=jitter)
 
         if not name or not path:
             raise CheckError('Error - Missing name and/or path from check definition.')
@@ -60,34 +134,38 @@ class Check(Switchable):
         self.args = args
         self.details = details
         self.data = data
+        self.timeout = self._validate_timeout(timeout)
         self.current_status = self.STATUS['UNKNOWN']
         self.previous_status = self.STATUS['UNKNOWN']
         self._platform_setup = platform_setup
 
+    def _validate_timeout(self, timeout):
+        try:
+            if timeout is not None and float(timeout) < 0:
+                raise CheckError('Error - Check timeout must be a positive value.')
+        except (TypeError, ValueError):
+            raise CheckError('Error - \'{:}\' is not a valid check timeout.'.format(timeout))
+
+        return float(timeout) if timeout is not None else None
+
     def _update_matches(self, check_status):
-        return (self.id == check_status['id']) and (check_status['status'] in list(self.STATUS.values())) and \
+        return (self.id == check_status['id']) and (check_status['status'] in self.STATUS_VALUES) and \
             self.enabled
 
     def update_status(self, check_status):
-        updated = False
+        return _update_status(self, check_status)
 
-        try:
-            if self._update_matches(check_status):
-                self.previous_status = self.current_status
-                self.current_status = check_status['status']
-                self.details = check_status.get('details', '')
-                self.data = check_status.get('data', None)
-                updated = True
-        except KeyError:
-            raise CheckError('Error - Can\'t update check\'s status. Missing id and/or status from check reply.')
+    def new_state(self):
+        return CheckState(self)
 
-        return updated
+    def snapshot(self):
+        return CheckSnapshot(**self.to_dict())
 
     @staticmethod
     def get_status(status):
         try:
-            return list(Check.STATUS)[list(Check.STATUS.values()).index(status)]
-        except ValueError:
+            return Check.STATUS_NAMES[status]
+        except (KeyError, TypeError):
             raise CheckError('Error - Invalid status value : \'{:}\'.'.format(status))
 
     def to_dict(self):
@@ -102,6 +180,9 @@ class Check(Switchable):
         if self.args:
             d.update({'args': self.args})
 
+        if self.timeout is not None:
+            d.update({'timeout': self.timeout})
+
         return [d]
 
     def to_check_reply_dict(self):
@@ -152,14 +233,51 @@ class Check(Switchable):
             ))
 
         try:
-            return Popen(absolute_path + self._split_args(), stdout=PIPE).communicate()[0]
+            return self._communicate(self._popen(absolute_path + self._split_args()))
         except OSError as e:
             raise CheckError('Error - Couldn\'t run : {:} check. Details : {:}'.format(absolute_path, e))
 
+    def _popen(self, command):
+        return Popen(command, stdout=PIPE)
+
+    def _kill_process(self, process):
+        process.kill()
+
+    def _kill(self, process, expired):
+        expired.set()
+
+        try:
+            self._kill_process(process)
+        except OSError:
+            pass
+
+    # A timeout of zero (or no timeout at all) lets the check run for as long
+    # as it needs to.
+    def _communicate(self, process):
+        if not self.timeout:
+            return process.communicate()[0]
+
+        expired = Event()
+        timer = Timer(self.timeout, self._kill, [process, expired])
+        timer.start()
+
+        try:
+            output = process.communicate()[0]
+        finally:
+            timer.cancel()
+
+        if expired.is_set():
+            raise CheckTimeoutError('Error - Check was killed after running for {:} seconds.'.format(self.timeout))
+
+        return output
+
     def run(self):
         try:
             deserialized_output = self._deserialize_output(self._call_popen())
             self.update_status(deserialized_output)
+        except CheckTimeoutError as e:
+            self.current_status = self.STATUS['TIMEOUT']
+            self.details = str(e)
         except CheckError as e:
             self.current_status = self.STATUS['ERROR']
             self.details = str(e)
@@ -177,15 +295,78 @@ class Check(Switchable):
         return hash(self.name) ^ hash(self.path) ^ hash(self.args)
 
 
+class CheckState(object):
+    """
+    Status of a check for a single client. The check definition (id, name,
+    path, args, etc.) is shared by all clients, only its current and previous
+    status, details and data are stored per client. Any other attribute is
+    looked up on the check itself.
+    """
+
+    __slots__ = ['check', 'current_status', 'previous_status', 'details', 'data']
+
+    def __init__(self, check):
+        self.check = check
+        self.current_status = check.current_status
+        self.previous_status = check.previous_status
+        self.details = check.details
+        self.data = check.data
+
+    def __getattr__(self, attr):
+        if attr == 'check':
+            raise AttributeError(attr)
+
+        return getattr(self.check, attr)
+
+    def update_status(self, check_status):
+        return _update_status(self, check_status)
+
+    def to_dict(self):
+        d = self.check.to_dict()
+        d.update({a: getattr(self, a) for a in ['current_status', 'previous_status', 'details', 'data']})
+        return d
+
+    def snapshot(self):
+        return CheckSnapshot(**self.to_dict())
+
+    def as_list(self):
+        return [self]
+
+    def __eq__(self, other_check):
+        return self.check == getattr(other_check, 'check', other_check)
+
+    def __ne__(self, other_check):
+        return not self.__eq__(other_check)
+
+    def __hash__(self):
+        return hash(self.check)
+
+
 class UnixCheck(Check):
     def __new__(cls, *args, **kwargs):
         try:
-            global getpwnam
+            global getpwnam, setsid, killpg, SIGKILL
             from pwd import getpwnam
+            from os import setsid, killpg
+            from signal import SIGKILL
         except ImportError:
             pass
 
-        return super(UnixCheck, cls).__new__(cls, *args, **kwargs)
+        return super(UnixCheck, cls).__new__(cls)
+
+    # Every check runs in its own process group, so when it times out any
+    # process it started is killed too (otherwise those processes would keep
+    # the check's output open and communicate() would wait for them). Checks
+    # are run from many threads where preexec_fn isn't safe, it's only used
+    # on Python 2 which lacks start_new_session.
+    def _popen(self, command):
+        if PY2:
+            return Popen(command, stdout=PIPE, preexec_fn=setsid)
+
+        return Popen(command, stdout=PIPE, start_new_session=True)
+
+    def _kill_process(self, process):
+        killpg(process.pid, SIGKILL)
 
     def _owned_by_user(self, filename):
         user = self._platform_setup.config['run as']['user']
@@ -217,7 +398,11 @@ class WindowsCheck(Check):
         except ImportError:
             pass
 
-        return super(WindowsCheck, cls).__new__(cls, *args, **kwargs)
+        return super(WindowsCheck, cls).__new__(cls)
+
+    # Kills the check along with any process it started.
+    def _kill_process(self, process):
+        Popen(['taskkill', '/F', '/T', '/PID', str(process.pid)], stdout=PIPE, stderr=PIPE).communicate()
 
     def _find_interpreter(self, filename):
         try:
@@ -252,9 +437,13 @@ class WindowsCheck(Check):
         return split_args(self.args, posix=False)
 
 
-class CheckGroup(Switchable):
-    def __init__(self, name='', checks=None, enabled=True):
-        super(CheckGroup, self).__init__(enabled=enabled)
+class CheckGroup(Switchable, Schedulable):
+
+    ScheduleError = CheckGroupError
+
+    def __init__(self, name='', checks=None, interval=None, jitter=0, enabled=True):
+        Switchable.__init__(self, enabled=enabled)
+        Schedulable.__init__(self, interval=interval, jitter=jitter)
 
         if not name or not checks:
             raise CheckGroupError('Error - Missing name and/or checks from check group definition.')
@@ -265,6 +454,9 @@ class CheckGroup(Switchable):
     def update_status(self, check_status):
         return any([c.update_status(check_status) for c in self.checks])
 
+    def new_state(self):
+        return CheckGroupState(self)
+
     def to_dict(self):
         d = super(CheckGroup, self).to_dict(['id', 'name', 'enabled'])
         d.update({'checks': [c.to_dict() for c in self.checks]})
@@ -286,3 +478,42 @@ class CheckGroup(Switchable):
             hashed = hash(self.name) ^ list(self.checks).pop().__hash__()
 
         return hashed
+
+
+class CheckGroupState(object):
+    """
+    Status of a check group for a single client, that is : the per client
+    states of all of its checks.
+    """
+
+    __slots__ = ['check_group', 'checks']
+
+    def __init__(self, check_group):
+        self.check_group = check_group
+        self.checks = set([c.new_state() for c in check_group.checks])
+
+    def __getattr__(self, attr):
+        if attr in ['check_group', 'checks']:
+            raise AttributeError(attr)
+
+        return getattr(self.check_group, attr)
+
+    def update_status(self, check_status):
+        return any([c.update_status(check_status) for c in self.checks])
+
+    def to_dict(self):
+        d = {a: getattr(self, a) for a in ['id', 'name', 'enabled']}
+        d.update({'checks': [c.to_dict() for c in self.checks]})
+        return d
+
+    def as_list(self):
+        return [c for c in self.checks]
+
+    def __eq__(self, other_check_group):
+        return self.check_group == getattr(other_check_group, 'check_group', other_check_group)
+
+    def __ne__(self, other_check_group):
+        return not self.__eq__(other_check_group)
+
+    def __hash__(self):
+        return hash(self.check_group)
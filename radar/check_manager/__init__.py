@@ -20,8 +20,9 @@ Copyright 2015 Lucas Liendo.
 """
 
 
-from queue import Empty as EmptyQueue
 from threading import Thread, Event
+from multiprocessing.pool import ThreadPool
+from ..channel import ChannelClosed
 from ..logger import RadarLogger
 from ..check import UnixCheck, WindowsCheck, CheckError
 from ..protocol import Message
@@ -34,7 +35,6 @@ class CheckManagerError(Exception):
 
 class CheckManager(Thread):
 
-    STOP_EVENT_TIMEOUT = 0.2
     AVAILABLE_PLATFORMS = {
         'Unix': UnixCheck,
         'Windows': WindowsCheck,
@@ -46,6 +46,7 @@ class CheckManager(Thread):
         self._input_queue = input_queue
         self._output_queue = output_queue
         self.stop_event = stop_event or Event()
+        self._pool = None
         self._Check = self._get_platform_check_class()
         self._message_actions = {
             Message.TYPE['CHECK']: self._on_check,
@@ -60,9 +61,25 @@ class CheckManager(Thread):
         except KeyError:
             raise CheckManagerError('Error - Platform : \'{:}\' is not available.'.format(platform))
 
+    def _validate_workers(self, workers):
+        try:
+            if int(workers) < 1:
+                raise CheckManagerError('Error - At least one check worker is needed.')
+        except ValueError:
+            raise CheckManagerError('Error - \'{:}\' is not a valid number of check workers.'.format(workers))
+
+        return int(workers)
+
+    # Checks that don't define their own timeout are given the one set in the
+    # main config.
+    def _build_check(self, check):
+        check_args = {'timeout': self._platform_setup.config['check timeout']}
+        check_args.update(check)
+        return self._Check(name=check['path'], platform_setup=self._platform_setup, **check_args)
+
     def _build_checks(self, checks):
         try:
-            return [self._Check(name=c['path'], platform_setup=self._platform_setup, **c) for c in checks]
+            return [self._build_check(c) for c in checks]
         except KeyError:
             raise CheckError('Error - Server sent empty or invalid check.')
 
@@ -74,13 +91,13 @@ class CheckManager(Thread):
         self._on_check(message)
 
     def _log_action(self, message_type, check):
-        RadarLogger.log('{:} from {:}:{:} -> {:}'.format(
-            Message.get_type(message_type), self._platform_setup.config['connect']['to'],
-            self._platform_setup.config['connect']['port'], check)
-        )
+        RadarLogger.debug('{:} from {:}:{:} -> {:}', Message.get_type(message_type),
+                          self._platform_setup.config['connect']['to'], self._platform_setup.config['connect']['port'],
+                          check)
 
     def _log_incoming_message(self, message_type, message):
-        [self._log_action(message_type, check) for check in message]
+        if RadarLogger.is_enabled_for('debug'):
+            [self._log_action(message_type, check) for check in message]
 
     def _process_message(self, message_type, message):
         try:
@@ -95,14 +112,32 @@ class CheckManager(Thread):
     def is_stopped(self):
         return self.stop_event.is_set()
 
+    def _run_check(self, check):
+        return check.run().to_check_reply_dict()
+
+    # Checks are run concurrently by the pool workers, so a poll takes about
+    # as long as its slowest check.
     def _run_checks(self, checks):
-        checks_outputs = [c.run().to_check_reply_dict() for c in checks]
+        checks_outputs = self._pool.map(self._run_check, checks)
         self._output_queue.put_nowait(checks_outputs)
 
+    def _start_pool(self):
+        self._pool = ThreadPool(self._validate_workers(self._platform_setup.config['check workers']))
+
+    def _stop_pool(self):
+        self._pool.close()
+        self._pool.join()
+
+    # Blocks until a message arrives, the input channel gets closed when
+    # the client stops.
     def run(self):
-        while not self.is_stopped():
-            try:
-                queue_message = self._input_queue.get_nowait()
+        self._start_pool()
+
+        try:
+            while not self.is_stopped():
+                queue_message = self._input_queue.get()
                 self._process_message(queue_message['message_type'], queue_message['message'])
-            except EmptyQueue:
-                self.stop_event.wait(self.STOP_EVENT_TIMEOUT)
+        except ChannelClosed:
+            pass
+
+        self._stop_pool()
@@ -23,10 +23,9 @@ Copyright 2015 Lucas Liendo.
 from time import time
 from threading import Thread, Event
 from json import loads as deserialize_json, dumps as serialize_json
-from queue import Empty as EmptyQueue
 from ..logger import RadarLogger
-from ..network.client import Client
-from ..protocol import Message
+from ..network.client import Client, ClientSendError
+from ..protocol import Message, MessageNotReady
 
 
 class RadarClientLite(Client):
@@ -38,11 +37,23 @@ class RadarClientLite(Client):
         pass
 
     def send_message(self, message_type, message, message_options=Message.OPTIONS['NONE']):
-        return self._message.send(self, message_type, message, message_options=message_options)
+        return self.send_packed_message(Message.pack(message_type, message, message_options=message_options))
+
+    def send_packed_message(self, packed_message):
+        if self.buffers_output():
+            return self.write(packed_message)
+
+        return self._message.send_packed(self, packed_message)
 
     def receive_message(self):
         return self._message.receive(self)
 
+    def receive_messages(self):
+        return self._message.receive_messages(self)
+
+    def would_block(self):
+        return self._message.would_block()
+
 
 class RadarClient(RadarClientLite, Thread):
 
@@ -50,21 +61,24 @@ class RadarClient(RadarClientLite, Thread):
     CONNECT_DISCONNECT_INTERVAL = 0.5
     RECONNECT_DELAYS = [5, 15, 60]
 
+    # When the input channel can be watched along with the socket there's
+    # no need to wake up periodically to look for check replies.
     def __init__(self, platform_setup, input_queue, output_queue, stop_event=None):
-        Thread.__init__(self)
         RadarClientLite.__init__(
             self,
             platform_setup.config['connect']['to'],
             platform_setup.config['connect']['port'],
-            network_monitor_timeout=self.NETWORK_MONITOR_TIMEOUT,
+            network_monitor_timeout=None if input_queue.can_notify() else self.NETWORK_MONITOR_TIMEOUT,
             blocking_socket=False
         )
+        Thread.__init__(self)
         self._reconnect = platform_setup.config['reconnect']
         self._input_queue = input_queue
         self._output_queue = output_queue
         self._delays = self.RECONNECT_DELAYS
         self._connect_timestamp = 0
         self.stop_event = stop_event or Event()
+        self.set_output_listener(self._on_pending_output)
 
     def _sleep(self):
         self.stop_event.wait(self._delays[0])
@@ -85,7 +99,15 @@ class RadarClient(RadarClientLite, Thread):
         RadarLogger.log('Connected to {:}:{:}.'.format(self.address, self.port))
         self._connect_timestamp = time()
 
+    # Replies that couldn't be sent right away are kept in the output buffer
+    # and the socket is watched for writing until they're flushed (see
+    # _watched_output_fds).
+    def _on_pending_output(self, client):
+        pass
+
+    # Whatever was left unsent belongs to the old connection.
     def on_disconnect(self):
+        self.discard_output()
         RadarLogger.log('Disconnected from {:}:{:}.'.format(self.address, self.port))
         self._should_give_up_reconnect()
 
@@ -102,20 +124,91 @@ class RadarClient(RadarClientLite, Thread):
                 else:
                     self.stop_event.set()
 
-    def on_receive(self):
-        message_type, message = self.receive_message()
+    def _enqueue_message(self, message_type, message):
         self._output_queue.put_nowait({
             'message_type': message_type,
-            'message': deserialize_json(message),
+            'message': deserialize_json(message.tobytes()),
         })
 
-    def on_timeout(self):
+    def on_receive(self):
         try:
-            serialized_message = serialize_json(self._input_queue.get_nowait())
-            self.send_message(Message.TYPE['CHECK REPLY'], serialized_message)
-        except EmptyQueue:
+            [self._enqueue_message(message_type, message) for message_type, message in self.receive_messages()]
+        except MessageNotReady:
             pass
 
+        self._flush_replies()
+
+    def _drain_replies(self):
+        return [r for replies in self._input_queue.drain() for r in replies]
+
+    def _build_payload(self, serialized_replies):
+        return '[' + ', '.join(serialized_replies) + ']'
+
+    # Packs as many check replies as possible into a single payload, a new payload
+    # is only started when the current one would exceed the maximum payload size.
+    def _coalesce_replies(self, replies):
+        payloads = []
+        serialized_replies = []
+        payload_size = len(self._build_payload([]))
+
+        for serialized_reply in [serialize_json(r) for r in replies]:
+            reply_size = len(serialized_reply) + len(', ')
+
+            if serialized_replies and (payload_size + reply_size >= Message.MAX_PAYLOAD_SIZE):
+                payloads.append(self._build_payload(serialized_replies))
+                serialized_replies = []
+                payload_size = len(self._build_payload([]))
+
+            serialized_replies.append(serialized_reply)
+            payload_size += reply_size
+
+        if serialized_replies:
+            payloads.append(self._build_payload(serialized_replies))
+
+        return payloads
+
+    # All pending check replies are sent at once (both after a reception and
+    # on every timeout) instead of sending a single reply per timeout. New
+    # replies are only taken once the previous ones were completely sent, so
+    # while the server doesn't keep up replies wait in the input channel.
+    def _flush_replies(self):
+        if self.has_pending_output() and not self.flush():
+            return
+
+        for payload in self._coalesce_replies(self._drain_replies()):
+            self.send_message(Message.TYPE['CHECK REPLY'], payload.encode('utf-8'))
+
+    # Replies sent outside on_receive report their send errors just like
+    # on_receive does.
+    def _send_replies(self):
+        try:
+            self._flush_replies()
+        except ClientSendError as error:
+            self.on_send_error(error)
+
+    # Also called when the socket becomes writable again.
+    def on_timeout(self):
+        self._send_replies()
+
+    def _watched_fds(self):
+        if self._input_queue.can_notify() and not self.has_pending_output():
+            return [self.socket, self._input_queue]
+
+        return [self.socket]
+
+    def _watched_output_fds(self):
+        return [self.socket] if self.has_pending_output() else []
+
+    # Check replies are sent as soon as the CheckManager hands them over.
+    def _watch(self):
+        ready_fds = super(RadarClient, self)._watch()
+
+        if self._input_queue in ready_fds:
+            ready_fds.remove(self._input_queue)
+            self._send_replies()
+
+        return ready_fds
+
     def is_stopped(self):
         return self.stop_event.is_set()
 
@@ -125,3 +218,6 @@ class RadarClient(RadarClientLite, Thread):
         while not self.is_stopped():
             super(RadarClient, self).run()
             self.connect()
+
+        # Closing the channel wakes up the CheckManager so it can finish too.
+        self._output_queue.close()
@@ -23,42 +23,92 @@ Copyright 2015 Lucas Liendo.
 from ..logger import RadarLogger
 from ..protocol import Message
 from ..check import Check
+from ..misc import Address, AddressIndex
 
 
 class ClientManager(object):
     def __init__(self, server_setup):
         self._monitors = server_setup.monitors
+        self._resolver = server_setup.resolver
+        self._dispatch_filter = server_setup.dispatch_filter
+        self._address_index = self._build_address_index()
+        self._routes = {}
         self._message_actions = {
             Message.TYPE['CHECK REPLY']: self._on_check_reply,
             Message.TYPE['TEST REPLY']: self._on_test_reply,
         }
 
+    def _build_address_index(self):
+        return AddressIndex([(a, m) for m in self._monitors for a in m.addresses])
+
+    def _refresh_address(self, address, hostnames):
+        if (type(address) == Address) and (address.hostname in hostnames):
+            return Address(address.hostname, resolve=self._resolver.lookup)
+
+        return address
+
+    # Hostnames whose ttl expired are resolved again. Monitors addresses (and
+    # the address index) are only rebuilt if any of them changed, meanwhile
+    # clients keep being matched against the last known addresses.
+    def refresh_hostnames(self):
+        hostnames = self._resolver.refresh()
+
+        if hostnames:
+            for m in self._monitors:
+                m.addresses = set([self._refresh_address(a, hostnames) for a in m.addresses])
+
+            self._address_index = self._build_address_index()
+
+        return hostnames
+
+    # Only the monitors whose addresses contain the client's address are
+    # returned (monitors keep their definition order).
+    def _get_monitors(self, client):
+        return self._address_index.lookup(client.address)
+
     def matches_any_monitor(self, client):
-        return any([m.matches(client) for m in self._monitors])
+        return any([m.matches(client, address_matched=True) for m in self._get_monitors(client)])
 
+    # Replies are only offered to the monitors the client was added to.
     def _update_checks(self, client, statuses):
-        updated_checks = [m.update_checks(client, statuses) for m in self._monitors if m.enabled]
+        updated_checks = [self._filter(client, m, m.update_checks(client, statuses))
+                          for m in self._routes.get(client, []) if m.enabled]
         return [uc for uc in updated_checks if uc]
 
+    # If a dispatch filter is set, only the checks that changed are reported.
+    def _filter(self, client, monitor, updated_checks):
+        if self._dispatch_filter is None:
+            return updated_checks
+
+        return self._dispatch_filter.filter(client, monitor, updated_checks)
+
     def register(self, client):
-        [m.add_client(client) for m in self._monitors]
+        monitors = [m for m in self._get_monitors(client) if m.add_client(client, address_matched=True)]
+
+        if monitors:
+            self._routes[client] = monitors
 
     def unregister(self, client):
-        [m.remove_client(client) for m in self._monitors]
+        [m.remove_client(client) for m in self._routes.pop(client, [])]
+
+        if self._dispatch_filter is not None:
+            self._dispatch_filter.forget(client)
+
+    def get_checks(self):
+        return set([c for m in self._monitors for c in m.checks])
 
-    def poll(self, message_type=Message.TYPE['CHECK']):
-        [m.poll(message_type) for m in self._monitors if m.enabled]
+    def poll(self, message_type=Message.TYPE['CHECK'], checks=None, slot=0, slots=1):
+        [m.poll(message_type, checks=checks, slot=slot, slots=slots) for m in self._monitors if m.enabled and m.active_clients]
 
     def _log_reply(self, client, message_type, check):
-        check['status'] = Check.get_status(check['status'])
-        RadarLogger.log('{:} from {:}:{:} -> {:}'.format(
-            Message.get_type(message_type), client.address, client.port,
-            check)
-        )
-        check['status'] = Check.STATUS[check['status']]
+        RadarLogger.debug('{:} from {:}:{:} -> {:}', Message.get_type(message_type), client.address, client.port,
+                          dict(check, status=Check.get_status(check['status'])))
 
+    # Every single reply is logged at debug level, nothing is done unless
+    # debug logging is enabled.
     def _log_incoming_message(self, client, message_type, message):
-        [self._log_reply(client, message_type, check) for check in message]
+        if RadarLogger.is_enabled_for('debug'):
+            [self._log_reply(client, message_type, check) for check in message]
 
     def _on_check_reply(self, client, message_type, message):
         self._log_incoming_message(client, message_type, message)
@@ -25,6 +25,7 @@ from abc import ABCMeta
 from io import open
 from yaml import safe_load, YAMLError
 from ..logger import RadarLogger
+from ..protocol import Message
 
 
 class ConfigError(Exception):
@@ -95,7 +96,13 @@ class ConfigBuilder(object):
     def configure(self, *args):
         RadarLogger(
             self.config['log']['to'], max_size=self.config['log']['size'],
-            rotations=self.config['log']['rotations']
+            rotations=self.config['log']['rotations'], level=self.config['log']['level'],
+            asynchronous=self.config['log']['asynchronous'], queue_size=self.config['log']['queue size'],
+            queue_policy=self.config['log']['queue policy']
+        )
+        Message.configure(
+            compress=self.config['compression']['enabled'],
+            compress_threshold=self.config['compression']['threshold']
         )
 
     def tear_down(self):
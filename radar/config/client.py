@@ -43,10 +43,21 @@ class ClientConfig(ConfigBuilder):
             'to': '',
             'size': 100,
             'rotations': 5,
+            'level': 'info',
+            'asynchronous': False,
+            'queue size': 1000,
+            'queue policy': 'drop',
+        },
+
+        'compression': {
+            'enabled': False,
+            'threshold': 1024,
         },
 
         'enforce ownership': True,
         'reconnect': True,
+        'check workers': 4,
+        'check timeout': 60,
     }
 
     def __init__(self, path=None):
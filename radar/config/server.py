@@ -31,6 +31,8 @@ from ..check import Check, CheckGroup, CheckError, CheckGroupError
 from ..contact import Contact, ContactGroup, ContactError, ContactGroupError
 from ..monitor import Monitor
 from ..misc import Address, AddressRange, AddressError, SequentialIdGenerator
+from ..resolver import HostnameResolver
+from ..dispatch_filter import DispatchFilter
 from ..class_loader import ClassLoader
 from ..plugin import ServerPlugin
 
@@ -145,6 +147,8 @@ class CheckGroupBuilder(CheckBuilder):
         return CheckGroup(
             name=check_group['name'],
             checks=self._build_checks(check_group['checks'], defined_checks),
+            interval=check_group.get('interval', None),
+            jitter=check_group.get('jitter', 0),
             enabled=check_group.get('enabled', True)
         )
 
@@ -165,8 +169,32 @@ class MonitorBuilder(ConfigBuilder):
 
     TAG = 'monitor'
 
-    def _build_address(self, address):
-        for A in [Address, AddressRange]:
+    # Only dashes between dotted quads make a range, hostnames often contain
+    # dashes too (e.g. web-01.example.com).
+    def _is_range(self, address):
+        return ('-' in address) and all([Address.IPV4_REGEXP.match(a.strip()) for a in address.split('-', 1)])
+
+    def _is_hostname(self, address):
+        return not self._is_range(address) and not Address.IPV4_REGEXP.match(address.strip())
+
+    # Hostnames are gathered before building any monitor, this allows to
+    # resolve all of them at once.
+    def get_hostnames(self):
+        try:
+            hosts = [h for m in self._filter_config(self.TAG) for h in m[self.TAG]['hosts']]
+            return [h.strip() for h in hosts if self._is_hostname(h)]
+        except (KeyError, TypeError, AttributeError):
+            return []
+
+    def _build_address(self, address, resolver):
+        resolve = resolver.lookup if resolver is not None else None
+        builders = [lambda a: Address(a, resolve=resolve), lambda a: AddressRange(a, resolve=resolve)]
+
+        # Ranges are never looked up as hostnames.
+        if self._is_range(address):
+            builders.reverse()
+
+        for A in builders:
             try:
                 return A(address)
             except AddressError as e:
@@ -174,24 +202,24 @@ class MonitorBuilder(ConfigBuilder):
 
         raise error
 
-    def _build_monitor(self, monitor, checks, contacts):
+    def _build_monitor(self, monitor, checks, contacts, resolver):
         monitor = monitor[self.TAG]
 
         return Monitor(
             name=monitor.get('name', ''),
-            addresses=[self._build_address(address) for address in monitor['hosts']],
+            addresses=[self._build_address(address, resolver) for address in monitor['hosts']],
             checks=[c for c in checks if c.name in monitor['watch']],
             contacts=[c for c in contacts if c.name in monitor['notify']],
             enabled=monitor.get('enabled', True)
         )
 
-    def _build_monitors(self, monitors, checks, contacts):
-        return set([self._build_monitor(m, checks, contacts) for m in monitors])
+    def _build_monitors(self, monitors, checks, contacts, resolver):
+        return set([self._build_monitor(m, checks, contacts, resolver) for m in monitors])
 
-    def build(self, checks, contacts):
+    def build(self, checks, contacts, resolver=None):
         try:
             monitors_config = self._filter_config(self.TAG)
-            monitors = list(self._build_monitors(monitors_config, checks, contacts))
+            monitors = list(self._build_monitors(monitors_config, checks, contacts, resolver))
         except KeyError as e:
             raise ConfigError('Error - Missing \'{:}\' while creating monitor from {:}.'.format(e.args[0], self.path))
         except TypeError as e:
@@ -209,6 +237,10 @@ class ServerConfig(ConfigBuilder):
         'listen': {
             'address': 'localhost',
             'port': 3333,
+            'accept limit': 64,
+            'output limit': 1048576,
+            'output limit action': 'drop',
+            'edge triggered': False,
         },
 
         'run as': {
@@ -220,9 +252,30 @@ class ServerConfig(ConfigBuilder):
             'to': '',
             'size': 100,
             'rotations': 5,
+            'level': 'info',
+            'asynchronous': False,
+            'queue size': 1000,
+            'queue policy': 'drop',
+        },
+
+        'compression': {
+            'enabled': False,
+            'threshold': 1024,
         },
 
         'polling time': 300,
+        'poll slots': 1,
+
+        'hostname resolution': {
+            'workers': 8,
+            'ttl': 300,
+        },
+
+        'dispatch': {
+            'changes only': False,
+            'tolerance': 0,
+            'heartbeat': 300,
+        },
     }
 
     def __init__(self, path=None):
@@ -230,6 +283,8 @@ class ServerConfig(ConfigBuilder):
         self.merge_config(self.PLATFORM_CONFIG)
         self.monitors = []
         self.plugins = []
+        self.resolver = None
+        self.dispatch_filter = None
 
     def _search_files(self, path):
         files = [join_path(root, f) for root, _, files in walk(path) for f in files]
@@ -261,19 +316,34 @@ class ServerConfig(ConfigBuilder):
 
         return checks + check_groups
 
+    # All monitors' hostnames are resolved concurrently before any monitor
+    # gets built.
     def _build_monitors(self, checks, contacts):
-        files = self._search_files(self.config['monitors'])
+        builders = [MonitorBuilder(f) for f in self._search_files(self.config['monitors'])]
+        self.resolver.resolve([h for b in builders for h in b.get_hostnames()])
 
         try:
-            return self._build_and_reduce(MonitorBuilder, files, builder_args=[checks, contacts])
+            return reduce(lambda l, m: l + m, [b.build(checks, contacts, resolver=self.resolver) for b in builders])
         except TypeError:
             raise ConfigError('Error - No defined monitors could be found.')
 
+    def _build_dispatch_filter(self):
+        if not self.config['dispatch']['changes only']:
+            return None
+
+        return DispatchFilter(tolerance=self.config['dispatch']['tolerance'],
+                              heartbeat=self.config['dispatch']['heartbeat'])
+
     def _load_plugins(self):
         plugin_classes = ClassLoader(self.config['plugins']).get_classes(subclass=ServerPlugin)
         return set([P() for P in plugin_classes])
 
     def build(self):
+        self.resolver = HostnameResolver(
+            workers=self.config['hostname resolution']['workers'],
+            ttl=self.config['hostname resolution']['ttl']
+        )
         self.monitors = self._build_monitors(self._build_checks(), self._build_contacts())
         self.plugins = self._load_plugins()
+        self.dispatch_filter = self._build_dispatch_filter()
         return self
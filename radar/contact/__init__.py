@@ -20,6 +20,7 @@ Copyright 2015 Lucas Liendo.
 """
 
 
+from collections import namedtuple
 from functools import reduce
 from ..misc import Switchable
 
@@ -32,6 +33,18 @@ class ContactGroupError(Exception):
     pass
 
 
+class ContactSnapshot(namedtuple('ContactSnapshot', ['id', 'name', 'email', 'phone', 'enabled'])):
+    """ Immutable copy of a contact, this is what plugins get. """
+
+    __slots__ = ()
+
+    def to_dict(self):
+        return dict(zip(self._fields, self))
+
+    def as_list(self):
+        return [self]
+
+
 class Contact(Switchable):
     def __init__(self, id=None, name='', email='', phone='', enabled=True):
         super(Contact, self).__init__(id=id, enabled=enabled)
@@ -46,6 +59,9 @@ class Contact(Switchable):
     def to_dict(self):
         return super(Contact, self).to_dict(['id', 'name', 'email', 'phone', 'enabled'])
 
+    def snapshot(self):
+        return ContactSnapshot(**self.to_dict())
+
     def as_list(self):
         return [self]
 
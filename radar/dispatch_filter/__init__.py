@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from numbers import Number
+from time import time
+
+
+class DispatchFilterError(Exception):
+    pass
+
+
+class DispatchFilter(object):
+    """
+    This class decides which updated checks are handed to plugins. A check
+    is only dispatched if its status, details or data changed since the last
+    time it was dispatched. Numbers (found in data) are considered to change
+    only if they move more than a given fraction (tolerance) of their last
+    dispatched value. Also every heartbeat seconds (piggybacked on a reply)
+    all the checks a client has on a monitor are dispatched regardless of
+    any change.
+    """
+
+    def __init__(self, tolerance=0, heartbeat=300):
+        self.tolerance = self._validate_tolerance(tolerance)
+        self.heartbeat = self._validate_heartbeat(heartbeat)
+        self._dispatched = {}
+        self._heartbeats = {}
+
+    def _validate_tolerance(self, tolerance):
+        try:
+            if float(tolerance) < 0:
+                raise DispatchFilterError('Error - Dispatch tolerance must be a positive value.')
+        except (TypeError, ValueError):
+            raise DispatchFilterError('Error - \'{:}\' is not a valid dispatch tolerance.'.format(tolerance))
+
+        return float(tolerance)
+
+    # A heartbeat of 0 disables heartbeats.
+    def _validate_heartbeat(self, heartbeat):
+        try:
+            if float(heartbeat) < 0:
+                raise DispatchFilterError('Error - Dispatch heartbeat must be a positive value.')
+        except (TypeError, ValueError):
+            raise DispatchFilterError('Error - \'{:}\' is not a valid dispatch heartbeat.'.format(heartbeat))
+
+        return float(heartbeat)
+
+    def _is_number(self, value):
+        return isinstance(value, Number) and not isinstance(value, bool)
+
+    def _changed(self, old, new):
+        if self._is_number(old) and self._is_number(new):
+            return abs(new - old) > (self.tolerance * abs(old))
+
+        if isinstance(old, dict) and isinstance(new, dict):
+            return (set(old) != set(new)) or any([self._changed(old[k], new[k]) for k in old])
+
+        if isinstance(old, list) and isinstance(new, list):
+            return (len(old) != len(new)) or any([self._changed(o, n) for o, n in zip(old, new)])
+
+        return old != new
+
+    # Checks are remembered by monitor and check ids, as checks are equal to
+    # any other check having the same name, path and arguments (and monitors
+    # hash all their addresses, checks and contacts, which change over time).
+    def _has_changed(self, dispatched, monitor_id, check):
+        try:
+            status, details, data = dispatched[(monitor_id, check.id)]
+        except KeyError:
+            return True
+
+        return (status != check.current_status) or self._changed(details, check.details) or \
+            self._changed(data, check.data)
+
+    def _heartbeat_due(self, client, monitor_id, now):
+        if not self.heartbeat:
+            return False
+
+        heartbeats = self._heartbeats.setdefault(client, {})
+        due = heartbeats.get(monitor_id, now) < now
+
+        if due or (monitor_id not in heartbeats):
+            heartbeats[monitor_id] = now + self.heartbeat
+
+        return due
+
+    def _remember(self, dispatched, monitor_id, check):
+        dispatched[(monitor_id, check.id)] = (check.current_status, check.details, check.data)
+
+    # Gets and returns the checks updated on a monitor by a client's reply
+    # (as returned by Monitor.update_checks). Check groups are split into
+    # their checks.
+    def filter(self, client, monitor, updated):
+        if not updated:
+            return updated
+
+        dispatched = self._dispatched.setdefault(client, {})
+
+        if self._heartbeat_due(client, monitor.id, time()):
+            checks = [c for check in monitor.active_clients[client]['checks'] for c in check.as_list() if c.enabled]
+        else:
+            checks = [c for check in updated['checks'] for c in check.as_list() if self._has_changed(dispatched, monitor.id, c)]
+
+        [self._remember(dispatched, monitor.id, c) for c in checks]
+
+        return {'checks': set(checks), 'contacts': updated['contacts']} if checks else {}
+
+    def forget(self, client):
+        self._dispatched.pop(client, None)
+        self._heartbeats.pop(client, None)
@@ -67,6 +67,7 @@ class RadarLauncher(object):
     def __init__(self):
         cli = CLI(self._get_default_main_config_path(), program_name=self.PROGRAM_NAME, version=self.PROGRAM_VERSION)
         self._platform_setup = self._setup_platform(cli.main_config)
+        self._channels = []
 
     def _get_default_main_config_path(self):
         return self.AVAILABLE_PLATFORMS[Platform.get_platform_type()].MAIN_CONFIG_PATH
@@ -89,8 +90,11 @@ class RadarLauncher(object):
         while any([t.is_alive() for t in self._threads]):
             [t.join(self.THREAD_POLLING_TIME) for t in self._threads if t.is_alive()]
 
+    # Channels are closed after setting the stop event, so threads blocked
+    # reading from them wake up and notice they have to stop.
     def stop(self, *args):
         [t.stop_event.set() for t in self._threads]
+        [c.close() for c in self._channels]
 
     # Let's try to re-join the threads one more time for graceful termination.
     def _resume_interrupted_call(self, error):
@@ -20,9 +20,9 @@ Copyright 2015 Lucas Liendo.
 """
 
 
-from queue import Queue
 from threading import Event
 from . import RadarLauncher
+from ..channel import Channel
 from ..platform_setup.client import UnixClientSetup, WindowsClientSetup
 from ..check_manager import CheckManager
 from ..client import RadarClient
@@ -41,15 +41,15 @@ class RadarClientLauncher(RadarLauncher):
         super(RadarClientLauncher, self).__init__()
         self._threads = self._build_threads()
 
-    # TODO: Need better queue names (or maybe use a custom bidirectional alternative
-    # such as a Channel abstraction).
+    # The RadarClient watches the replies channel along with its socket.
     def _build_threads(self):
-        queue_a, queue_b = Queue(), Queue()
+        checks_channel, replies_channel = Channel(), Channel(notify=True)
+        self._channels = [checks_channel, replies_channel]
         stop_event = Event()
 
         return [
-            RadarClient(self._platform_setup, queue_a, queue_b, stop_event=stop_event),
-            CheckManager(self._platform_setup, queue_b, queue_a, stop_event=stop_event),
+            RadarClient(self._platform_setup, replies_channel, checks_channel, stop_event=stop_event),
+            CheckManager(self._platform_setup, checks_channel, replies_channel, stop_event=stop_event),
         ]
 
     def _start_and_join_threads(self):
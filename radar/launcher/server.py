@@ -20,11 +20,11 @@ Copyright 2015 Lucas Liendo.
 """
 
 
-from queue import Queue
 from threading import Event
 from . import RadarLauncher
+from ..channel import Channel
 from ..client_manager import ClientManager
-from ..server import RadarServer, RadarServerPoller
+from ..server import RadarServer, RadarServerPoller, RadarServerResolver
 from ..platform_setup.server import UnixServerSetup, WindowsServerSetup
 from ..plugin import PluginManager
 
@@ -44,13 +44,15 @@ class RadarServerLauncher(RadarLauncher):
 
     def _build_threads(self):
         client_manager = ClientManager(self._platform_setup)
-        queue = Queue()
+        channel = Channel()
+        self._channels = [channel]
         stop_event = Event()
 
         return [
-            RadarServer(client_manager, self._platform_setup, queue, stop_event=stop_event),
+            RadarServer(client_manager, self._platform_setup, channel, stop_event=stop_event),
             RadarServerPoller(client_manager, self._platform_setup, stop_event=stop_event),
-            PluginManager(self._platform_setup, queue, stop_event=stop_event),
+            RadarServerResolver(client_manager, self._platform_setup, stop_event=stop_event),
+            PluginManager(self._platform_setup, channel, stop_event=stop_event),
         ]
 
     def _start_and_join_threads(self):
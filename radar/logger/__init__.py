@@ -20,8 +20,10 @@ Copyright 2015 Lucas Liendo.
 """
 
 
-from logging import getLogger, Formatter, shutdown, INFO
+from logging import getLogger, makeLogRecord, Formatter, Handler, shutdown, DEBUG, INFO, WARNING, ERROR
 from logging.handlers import RotatingFileHandler
+from threading import Thread, Lock
+from queue import Queue, Full as FullQueue
 from os.path import dirname
 from os import mkdir
 from errno import EEXIST
@@ -32,14 +34,108 @@ class LoggerError(Exception):
     pass
 
 
+class AsyncHandler(Handler):
+    """
+    This handler queues log records and writes them through another handler
+    from a background thread, so callers never wait for the disk. When the
+    queue is full records are either dropped (and the amount of dropped
+    records is logged later on) or the caller blocks until there's room.
+    """
+
+    QUEUE_POLICIES = ['drop', 'block']
+
+    def __init__(self, handler, queue_size=1000, queue_policy='drop'):
+        queue_size = self._validate_queue_size(queue_size)
+        self._block = self._validate_queue_policy(queue_policy) == 'block'
+        Handler.__init__(self)
+        self._handler = handler
+        self._queue = Queue(maxsize=queue_size)
+        self._dropped = 0
+        self._dropped_lock = Lock()
+        self._writer = Thread(target=self._write)
+        self._writer.daemon = True
+        self._writer.start()
+
+    def _validate_queue_size(self, queue_size):
+        try:
+            if int(queue_size) < 1:
+                raise LoggerError('Error - Log queue size must be greater than 0.')
+        except ValueError:
+            raise LoggerError('Error - \'{:}\' is not a valid log queue size.'.format(queue_size))
+
+        return int(queue_size)
+
+    def _validate_queue_policy(self, queue_policy):
+        if queue_policy not in self.QUEUE_POLICIES:
+            raise LoggerError('Error - \'{:}\' is not a valid log queue policy.'.format(queue_policy))
+
+        return queue_policy
+
+    def emit(self, record):
+        try:
+            self._queue.put(record, block=self._block)
+        except FullQueue:
+            with self._dropped_lock:
+                self._dropped += 1
+
+    def _write_dropped(self):
+        with self._dropped_lock:
+            dropped, self._dropped = self._dropped, 0
+
+        if dropped:
+            self._handler.handle(makeLogRecord({
+                'msg': 'Error - {:} log messages were dropped (log queue was full).'.format(dropped),
+                'levelno': WARNING,
+                'levelname': 'WARNING',
+            }))
+
+    # A None record stops the writer.
+    def _write(self):
+        record = self._queue.get()
+
+        while record is not None:
+            self._write_dropped()
+            self._handler.handle(record)
+            record = self._queue.get()
+
+        self._write_dropped()
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
+        self._handler.close()
+        Handler.close(self)
+
+
 class RadarLogger(object):
 
+    LEVELS = {
+        'DEBUG': DEBUG,
+        'INFO': INFO,
+        'WARNING': WARNING,
+        'ERROR': ERROR,
+    }
+
     _shared_state = {'logger': None}
 
-    def __init__(self, path, logger_name='radar', max_size=100, rotations=5):
+    # If asynchronous is set, records are written to disk from a background
+    # thread (see AsyncHandler).
+    def __init__(self, path, logger_name='radar', max_size=100, rotations=5, level='info', asynchronous=False,
+                 queue_size=1000, queue_policy='drop'):
         self.__dict__ = self._shared_state
         self._create_dir(path)
-        self._shared_state['logger'] = self._configure_logger(path, logger_name, max_size * (1024 ** 2), rotations)
+        self._shared_state['logger'] = self._configure_logger(
+            path, logger_name, max_size * (1024 ** 2), rotations, self._validate_level(level),
+            asynchronous, queue_size, queue_policy)
+
+    @staticmethod
+    def _validate_level(level):
+        try:
+            return RadarLogger.LEVELS[str(level).upper()]
+        except KeyError:
+            raise LoggerError('Error - \'{:}\' is not a valid log level.'.format(level))
 
     def _create_dir(self, path):
         try:
@@ -48,25 +144,47 @@ class RadarLogger(object):
             if e.errno != EEXIST:
                 raise LoggerError('Error - Couldn\'t create directory : \'{:}\'. Details : {:}.'.format(path, e.strerror))
 
-    def _configure_logger(self, path, logger_name, max_size, rotations):
+    def _configure_logger(self, path, logger_name, max_size, rotations, level, asynchronous, queue_size, queue_policy):
         try:
             logger = getLogger(logger_name)
-            logger.setLevel(INFO)
+            logger.setLevel(level)
             file_handler = RotatingFileHandler(path, maxBytes=max_size, backupCount=rotations)
             file_handler.setFormatter(Formatter(fmt='%(asctime)s - %(message)s', datefmt='%b %d %H:%M:%S'))
-            logger.addHandler(file_handler)
+            logger.addHandler(AsyncHandler(file_handler, queue_size, queue_policy) if asynchronous else file_handler)
+        except LoggerError:
+            raise
         except Exception as e:
             raise LoggerError('Error - Couldn\'t configure Radar logger. Details : {:}.'.format(e))
 
         return logger
 
     @staticmethod
-    def log(message):
+    def is_enabled_for(level):
         try:
-            RadarLogger._shared_state['logger'].info(message)
+            return RadarLogger._shared_state['logger'].isEnabledFor(RadarLogger.LEVELS[level.upper()])
+        except AttributeError:
+            return False
+
+    # Messages are only formatted (using the given arguments) if they are going
+    # to be logged.
+    @staticmethod
+    def _log(level, message, args):
+        try:
+            logger = RadarLogger._shared_state['logger']
+
+            if logger.isEnabledFor(RadarLogger.LEVELS[level]):
+                getattr(logger, level.lower())(message.format(*args) if args else message)
         except Exception as e:
             stderr.write('Error - Couldn\'t log to Radar logger. Details : {:}.'.format(e))
 
+    @staticmethod
+    def log(message, *args):
+        RadarLogger._log('INFO', message, args)
+
+    @staticmethod
+    def debug(message, *args):
+        RadarLogger._log('DEBUG', message, args)
+
     @staticmethod
     def shutdown():
         shutdown()
@@ -20,8 +20,10 @@ Copyright 2015 Lucas Liendo.
 """
 
 
+from bisect import bisect_right
 from re import compile as compile_re
-from socket import gethostbyname
+from socket import gethostbyname, inet_aton
+from struct import unpack
 from abc import ABCMeta
 
 
@@ -30,39 +32,69 @@ class AddressError(Exception):
 
 
 class Address(object):
-    def __init__(self, address):
-        self.ip = self._validate(address.strip())
-        self.n = self._to_int()
+
+    __slots__ = ['ip', 'n', 'hostname']
+
+    IPV4_REGEXP = compile_re(r'^(\d{1,3}\.){3}\d{1,3}$')
+
+    # Integer values of already seen dotted quad strings. Hostnames are never
+    # cached as what they resolve to may change.
+    _int_cache = {}
+    INT_CACHE_SIZE = 65536
+
+    # A different resolve function (that maps a hostname to its ip address)
+    # may be given, otherwise hostnames are resolved using gethostbyname.
+    def __init__(self, address, resolve=None):
+        self.hostname = None
+        self.ip = self._validate(address.strip(), resolve or gethostbyname)
+        self.n = self._to_int(self.ip)
 
     def to_dict(self):
         return {'address': self.ip}
 
-    def _resolve_hostname(self, hostname):
+    def _resolve_hostname(self, hostname, resolve):
         try:
-            return gethostbyname(hostname)
+            self.hostname = hostname
+            return resolve(hostname)
         except Exception:
             raise AddressError('Error - Invalid hostname or address : \'{:}\'.'.format(hostname))
 
-    def _validate(self, address):
-        regexp = compile_re(r'(\d{1,3}\.){3}\d{1,3}')
-
+    def _validate(self, address, resolve):
         try:
-            if not regexp.match(address) or not all([int(octet) <= 255 for octet in address.split('.', 3)]):
-                return self._resolve_hostname(address)
+            if not self.IPV4_REGEXP.match(address) or not all([int(octet) <= 255 for octet in address.split('.', 3)]):
+                return self._resolve_hostname(address, resolve)
         except ValueError:
             raise AddressError('Error - Invalid host name or address : \'{:}\'.'.format(address))
 
         return address
 
-    def _to_int(self):
-        octets = [int(octet) for octet in self.ip.split('.', 3)]
-        return sum([byte * pow(256, n) for n, byte in enumerate(reversed(octets))])
+    @staticmethod
+    def _to_int(ip):
+        return unpack('!I', inet_aton(ip))[0]
+
+    @classmethod
+    def to_int(cls, address):
+        if type(address) == Address:
+            return address.n
+
+        try:
+            return cls._int_cache[address]
+        except KeyError:
+            n = Address(address).n
+
+        if cls.IPV4_REGEXP.match(address):
+            if len(cls._int_cache) >= cls.INT_CACHE_SIZE:
+                cls._int_cache.clear()
+
+            cls._int_cache[address] = n
+
+        return n
 
     def __eq__(self, other_address):
-        if type(other_address) == Address:
-            return self.n == other_address.n
+        return self.n == self.to_int(other_address)
 
-        return self.n == Address(other_address).n
+    def __ne__(self, other_address):
+        return not self.__eq__(other_address)
 
     def __hash__(self):
         return hash(self.ip) ^ hash(self.n)
@@ -72,8 +104,13 @@ class Address(object):
 
 
 class AddressRange(object):
-    def __init__(self, address_range):
-        self.start_ip, self.end_ip = self._validate(address_range.strip())
+
+    __slots__ = ['start_ip', 'end_ip']
+
+    # Hostname endpoints are resolved using the given resolve function (see
+    # Address).
+    def __init__(self, address_range, resolve=None):
+        self.start_ip, self.end_ip = self._validate(address_range.strip(), resolve)
 
     def to_dict(self):
         return {
@@ -81,8 +118,8 @@ class AddressRange(object):
             'end address': self.end_ip.ip,
         }
 
-    def _validate(self, address_range):
-        start_ip, end_ip = [Address(a) for a in address_range.split('-', 1)]
+    def _validate(self, address_range, resolve):
+        start_ip, end_ip = [Address(a, resolve=resolve) for a in address_range.split('-', 1)]
 
         if start_ip.n >= end_ip.n:
             raise AddressError('Error - Start ip address is lower (or equal) than end ip address : \'{:} - {:}\'.'.format(
@@ -95,17 +132,51 @@ class AddressRange(object):
             return self.start_ip == other_address_range.start_ip and \
                 self.end_ip == other_address_range.end_ip
 
-        return self.start_ip.n == AddressRange(other_address_range).start_ip.n and \
-            self.end_ip.n == AddressRange(other_address_range).end_ip.n
+        other_address_range = AddressRange(other_address_range)
+        return self.start_ip.n == other_address_range.start_ip.n and self.end_ip.n == other_address_range.end_ip.n
+
+    def __ne__(self, other_address_range):
+        return not self.__eq__(other_address_range)
 
     def __hash__(self):
         return self.start_ip.__hash__() ^ self.end_ip.__hash__()
 
     def __contains__(self, address):
-        if type(address) == Address:
-            return self.start_ip.n <= address.n <= self.end_ip.n
+        return self.start_ip.n <= Address.to_int(address) <= self.end_ip.n
+
+
+class AddressIndex(object):
+    """
+    This class maps addresses to the objects (e.g. monitors) whose addresses
+    or address ranges contain them. All given addresses and ranges are split
+    into non overlapping intervals, each interval knows which objects cover
+    it, so looking up an address is a single binary search.
+    """
+
+    def __init__(self, entries=None):
+        self._bounds = []
+        self._objects = []
+        self._build(entries or [])
+
+    def _to_interval(self, address):
+        if type(address) == AddressRange:
+            return address.start_ip.n, address.end_ip.n + 1
+
+        return address.n, address.n + 1
+
+    def _build(self, entries):
+        intervals = [(self._to_interval(a), o) for a, o in entries]
+        self._bounds = sorted(set([n for (start, end), _ in intervals for n in (start, end)]))
+        self._objects = [[] for _ in self._bounds]
+
+        for (start, end), o in intervals:
+            for i in range(bisect_right(self._bounds, start) - 1, bisect_right(self._bounds, end) - 1):
+                if all([x is not o for x in self._objects[i]]):
+                    self._objects[i].append(o)
 
-        return self.start_ip.n <= Address(address).n <= self.end_ip.n
+    def lookup(self, address):
+        i = bisect_right(self._bounds, Address.to_int(address)) - 1
+        return list(self._objects[i]) if i >= 0 else []
 
 
 class SequentialIdGenerator(object):
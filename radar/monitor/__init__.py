@@ -21,11 +21,13 @@ Copyright 2015 Lucas Liendo.
 
 
 from json import dumps as serialize_json
-from copy import deepcopy
 from functools import reduce
+from itertools import chain
 from ..logger import RadarLogger
 from ..misc import Switchable
 from ..network.client import ClientSendError
+from ..protocol import Message
+from ..scheduler import PollScheduler
 
 
 class MonitorError(Exception):
@@ -33,13 +35,18 @@ class MonitorError(Exception):
 
 
 class Monitor(Switchable):
+
+    POLL_CACHE_SIZE = 64
+
     def __init__(self, name='', addresses=None, checks=None, contacts=None, enabled=True):
         super(Monitor, self).__init__(enabled=enabled)
         self.name = name
         self.addresses = set(addresses) if addresses is not None else []
         self.checks = set(checks) if checks is not None else []
         self.contacts = set(contacts) if contacts is not None else []
-        self.active_clients = []
+        self.active_clients = {}
+        self._slotted_clients = {}
+        self._poll_cache = {}
         self._validate()
 
     def _validate(self):
@@ -49,58 +56,120 @@ class Monitor(Switchable):
         except IndexError:
             pass
 
-    def matches(self, new_client):
-        return (new_client not in [c['client'] for c in self.active_clients]) and \
-            any([new_client.address in a for a in self.addresses])
-
-    def add_client(self, client):
+    # Clients looked up through an AddressIndex are already known to be in
+    # this monitor's addresses (address_matched), so scanning them is skipped.
+    def matches(self, new_client, address_matched=False):
+        return (new_client not in self.active_clients) and \
+            (address_matched or any([new_client.address in a for a in self.addresses]))
+
+    # Maps every check id to the state that is updated by its replies along with
+    # the state that is reported as updated (they only differ for check groups).
+    def _index_checks(self, checks):
+        return {c.id: (c, check) for check in checks for c in check.as_list()}
+
+    # Every client gets its own checks' states (the checks themselves and the
+    # contacts are shared by all clients). Active clients are indexed by their
+    # connection.
+    def add_client(self, client, address_matched=False):
         added = False
 
-        if self.matches(client):
-            self.active_clients.append({
+        if self.matches(client, address_matched=address_matched):
+            checks = set([c.new_state() for c in self.checks])
+            self.active_clients[client] = {
                 'client': client,
-                'checks': deepcopy(self.checks),
-                'contacts': deepcopy(self.contacts),
-            })
+                'checks': checks,
+                'indexed checks': self._index_checks(checks),
+                'contacts': self.contacts,
+            }
+            [self._add_to_slot(slotted, client) for slotted in list(self._slotted_clients.values())]
             added = True
 
         return added
 
     def remove_client(self, client):
-        removed = False
-        pre_remove_clients_count = len(self.active_clients)
+        [s.discard(client) for slotted in list(self._slotted_clients.values()) for s in slotted]
+        return self.active_clients.pop(client, None) is not None
+
+    def _add_to_slot(self, slotted, client):
+        slotted[PollScheduler.get_slot(client.address, len(slotted))].add(client)
+
+    # Active clients split by the poll slot their address falls in. Clients
+    # are assigned a slot once (when added, or on the first staggered poll)
+    # instead of hashing their addresses on every poll.
+    def _get_slotted_clients(self, slots):
+        try:
+            return self._slotted_clients[slots]
+        except KeyError:
+            pass
 
-        self.active_clients = [c for c in self.active_clients if c['client'] != client]
+        slotted = [set() for _ in range(slots)]
+        [self._add_to_slot(slotted, c) for c in list(self.active_clients)]
+        self._slotted_clients[slots] = slotted
 
-        if len(self.active_clients) < pre_remove_clients_count:
-            removed = True
+        return slotted
 
-        return removed
+    def _update_check(self, indexed_checks, status):
+        try:
+            check, updated_check = indexed_checks[status['id']]
+        except KeyError:
+            return None
+
+        return updated_check if check.update_status(status) else None
 
     def update_checks(self, client, statuses):
         updated = {}
 
         try:
-            active_client = [c for c in self.active_clients if c['client'] == client].pop()
-            updated_checks = [c for c in active_client['checks'] for s in statuses if c.update_status(s)]
+            indexed_checks = self.active_clients[client]['indexed checks']
+        except KeyError:
+            return updated
 
-            if updated_checks:
-                updated['checks'] = set(updated_checks)
-                updated['contacts'] = set([c for c in active_client['contacts'] if c.enabled])
-        except IndexError:
-            pass
+        updated_checks = [c for c in [self._update_check(indexed_checks, s) for s in statuses] if c is not None]
+
+        if updated_checks:
+            updated['checks'] = set(updated_checks)
+            updated['contacts'] = set([c for c in self.contacts if c.enabled])
 
         return updated
 
-    def _poll_client(self, client, message_type, message):
+    def _poll_client(self, client, packed_message):
         try:
-            client.send_message(message_type, serialize_json(message))
+            client.send_packed_message(packed_message)
         except ClientSendError as e:
             RadarLogger.log(e)
 
-    def poll(self, message_type):
-        message = reduce(lambda l, m: l + m, [c.to_check_dict() for c in self.checks if c.enabled])
-        [self._poll_client(c['client'], message_type, message) for c in self.active_clients]
+    # The message (and its packed frame) only depends on which checks are
+    # polled and enabled, so it is built once and reused for every client
+    # and every following poll of the same checks. Enabling or disabling
+    # a check results in a different key, so a new message is built.
+    def _build_poll(self, message_type, polled_checks):
+        enabled_checks = [c for c in polled_checks if c.enabled]
+        key = (message_type, frozenset([c.id for c in enabled_checks]))
+
+        try:
+            return self._poll_cache[key]
+        except KeyError:
+            pass
+
+        if len(self._poll_cache) >= self.POLL_CACHE_SIZE:
+            self._poll_cache.clear()
+
+        message = list(chain.from_iterable([c.to_check_dict() for c in enabled_checks]))
+        packed_message = Message.pack(message_type, serialize_json(message).encode('utf-8')) if message else None
+        self._poll_cache[key] = (message, packed_message)
+
+        return self._poll_cache[key]
+
+    # If a list of checks is given, only the ones that belong to this monitor
+    # are polled. If polls are staggered, only the clients whose address
+    # falls in the given slot are polled.
+    def poll(self, message_type, checks=None, slot=0, slots=1):
+        polled_checks = self.checks if checks is None else self.checks.intersection(checks)
+        message, packed_message = self._build_poll(message_type, polled_checks)
+        polled_clients = list(self.active_clients) if slots == 1 else list(self._get_slotted_clients(slots)[slot])
+
+        if message:
+            [self._poll_client(c, packed_message) for c in polled_clients]
 
         return message
 
@@ -114,7 +183,7 @@ class Monitor(Switchable):
     def to_dict(self):
         d = super(Monitor, self).to_dict(['id', 'name', 'enabled'])
         d.update({
-            'clients': [self._active_client_to_dict(c) for c in self.active_clients]
+            'clients': [self._active_client_to_dict(c) for c in list(self.active_clients.values())]
         })
 
         return d
@@ -21,6 +21,8 @@ Copyright 2015 Lucas Liendo.
 
 
 from abc import ABCMeta, abstractmethod
+from collections import deque
+from threading import Lock
 from socket import create_connection, SOL_SOCKET, SO_LINGER, error as SocketError
 from select import select, error as SelectError
 from struct import pack
@@ -61,6 +63,12 @@ class Client(object):
         self.socket = socket
         self.network_monitor_timeout = network_monitor_timeout
         self.blocking_socket = blocking_socket
+        self.output_limit = None
+        self.output_overflowed = False
+        self._output = deque()
+        self._output_size = 0
+        self._output_lock = Lock()
+        self._output_listener = None
 
     def connect(self):
         if self.is_connected():
@@ -111,22 +119,119 @@ class Client(object):
 
         return sent_bytes
 
+    # Once an output listener is set, data is written through the output
+    # buffer (see write) and the listener gets called every time some data
+    # could not be sent right away.
+    def set_output_listener(self, listener, output_limit=None):
+        self._output_listener = listener
+        self.output_limit = output_limit
+
+    def buffers_output(self):
+        return self._output_listener is not None
+
+    def has_pending_output(self):
+        return len(self._output) > 0
+
+    # Sends as much buffered data as possible without blocking. Must be called
+    # holding the output lock. Returns True if the output buffer got empty.
+    def _send_output(self):
+        socket = self.socket
+
+        if socket is None:
+            raise ClientSendError('Error - Couldn\'t send data to {:}:{:} (not connected).'.format(
+                self.address, self.port))
+
+        while self._output:
+            data = self._output[0]
+
+            try:
+                sent_bytes = socket.send(data)
+            # Can we do : except SocketError as (_, e): ?
+            except SocketError as e:
+                if e.errno in [EWOULDBLOCK, EAGAIN]:
+                    break
+
+                raise ClientSendError('Error - Couldn\'t send data to {:}:{:}. Details : {:}.'.format(
+                    self.address, self.port, e.strerror))
+
+            if sent_bytes < len(data):
+                self._output[0] = data[sent_bytes:]
+            else:
+                self._output.popleft()
+
+            self._output_size -= sent_bytes
+
+        if not self._output:
+            self.output_overflowed = False
+
+        return not self._output
+
+    # Data is sent right away if nothing else is waiting to be sent, otherwise
+    # (or if the socket can't take it all) it is kept in the output buffer
+    # until flush is called. If the output limit is reached data is dropped.
+    def write(self, data):
+        with self._output_lock:
+            dropped = (self.output_limit is not None) and (self._output_size + len(data) > self.output_limit)
+
+            if dropped:
+                self.output_overflowed = True
+                flushed = False
+            else:
+                self._output.append(data)
+                self._output_size += len(data)
+                flushed = self._send_output() if len(self._output) == 1 else False
+
+        if not flushed:
+            self._output_listener(self)
+
+        if dropped:
+            raise ClientSendError('Error - Output limit reached for {:}:{:}, {:} bytes dropped.'.format(
+                self.address, self.port, len(data)))
+
+        return len(data)
+
+    def flush(self):
+        with self._output_lock:
+            return self._send_output()
+
+    def discard_output(self):
+        with self._output_lock:
+            self._output.clear()
+            self._output_size = 0
+            self.output_overflowed = False
+
     def receive(self, length):
         try:
             received_bytes = self.socket.recv(length)
         # Can we do : except SocketError as (error_code_, error_details): ?
         except SocketError as e:
-            if self._would_block(e[0]):
+            if self._would_block(e.errno):
                 raise ClientDataNotReady('Error - Non blocking socket attempting read ahead.')
 
             raise ClientReceiveError('Error - Couldn\'t receive data from {:}:{:}. Details : {:}.'.format(
-                self.address, self.port, e[1]))
+                self.address, self.port, e.strerror))
 
         if len(received_bytes) == 0:
             raise ClientDisconnected()
 
         return received_bytes
 
+    def receive_into(self, buffer):
+        try:
+            received_bytes = self.socket.recv_into(buffer)
+        # Can we do : except SocketError as (error_code_, error_details): ?
+        except SocketError as e:
+            if self._would_block(e.errno):
+                raise ClientDataNotReady('Error - Non blocking socket attempting read ahead.')
+
+            raise ClientReceiveError('Error - Couldn\'t receive data from {:}:{:}. Details : {:}.'.format(
+                self.address, self.port, e.strerror))
+
+        if received_bytes == 0:
+            raise ClientDisconnected()
+
+        return received_bytes
+
     def on_connect(self):
         pass
 
@@ -167,12 +272,22 @@ class Client(object):
             self.on_send_error(error)
         except ClientDisconnected:
             self.disconnect()
+        except ClientAbortError:
+            self.abort()
+
+    def _watched_fds(self):
+        return [self.socket]
+
+    # Fds watched for writing. When any of them becomes writable (and no data
+    # arrived) on_timeout is called.
+    def _watched_output_fds(self):
+        return []
 
     def _watch(self):
         ready_fds = []
 
         try:
-            ready_fds, _, _ = select([self.socket], [], [], self.network_monitor_timeout)
+            ready_fds, _, _ = select(self._watched_fds(), self._watched_output_fds(), [], self.network_monitor_timeout)
         except SelectError as e:
             if not self._interrupted_by_signal(e):
                 raise e
@@ -192,3 +307,6 @@ class Client(object):
 
     def __eq__(self, other_client):
         return self.address == other_client.address
+
+    def __hash__(self):
+        return hash(self.address)
@@ -36,33 +36,54 @@ class NetworkMonitor(object):
 
     __metaclass__ = ABCMeta
 
-    def __init__(self, server, timeout=None):
+    SUPPORTS_EDGE_TRIGGERED = False
+
+    # Edge triggered notifications are only honored by network monitors that
+    # support them (currently only the EPollMonitor).
+    def __init__(self, server, timeout=None, edge_triggered=False):
         self._server = server
         self._timeout = timeout
+        self._edge_triggered = edge_triggered and self.SUPPORTS_EDGE_TRIGGERED
         RadarLogger.log('Multiplexing strategy : {:}.'.format(self.__class__.__name__))
 
+    # Besides clients the server's listen socket is watched and so is the
+    # channel clients with buffered output are handed through (see
+    # Server._on_output), otherwise that output would wait for the next
+    # timeout to be sent.
+    def _server_fds(self):
+        if self._server._pending_output.can_notify():
+            return [self._server.socket, self._server._pending_output]
+
+        return [self._server.socket]
+
     def _client_arrived(self, fds):
         return self._server.socket.fileno() in fds
 
-    def _client_ready(self, client, fds):
-        return client.socket.fileno() in fds
+    def _output_arrived(self, fds):
+        return self._server._pending_output.can_notify() and (self._server._pending_output.fileno() in fds)
 
+    # Connected clients are indexed by their file descriptor, so only ready
+    # descriptors are looked up (instead of scanning every connected client).
     def _ready_clients(self, fds):
-        return [c for c in self._server._clients if self._client_ready(c, fds)]
+        return [self._server._clients[fd] for fd in fds if fd in self._server._clients]
+
+    # Writable clients are looked up after serving the readable ones, as some
+    # of them might have been disconnected meanwhile.
+    def _watch(self, fds, writable_fds=None):
+        writable_fds = writable_fds or []
 
-    def _watch(self, fds):
         if self._client_arrived(fds):
-            client = self._server._accept()
+            self._server._accept_clients()
             fds.remove(self._server.socket.fileno())
 
-            if self._server.accept_client(client):
-                self._server._on_connect(client)
-            else:
-                self._server._on_reject(client)
+        if self._output_arrived(fds):
+            self._server._watch_pending_output()
+            fds.remove(self._server._pending_output.fileno())
 
-        self._server._serve_ready_clients(self._ready_clients(fds))
+        self._server._serve_ready_clients(self._ready_clients(fds), drain=self._edge_triggered)
+        self._server._flush_ready_clients(self._ready_clients(writable_fds))
 
-        if not fds:
+        if not fds and not writable_fds:
             self._server.on_timeout()
 
     def on_connect(self, client):
@@ -71,6 +92,13 @@ class NetworkMonitor(object):
     def on_disconnect(self, client):
         pass
 
+    # Clients are only watched for writing while they have buffered output.
+    def on_output(self, client):
+        pass
+
+    def on_output_flushed(self, client):
+        pass
+
     @abstractmethod
     def watch(self):
         pass
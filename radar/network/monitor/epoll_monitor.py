@@ -24,29 +24,47 @@ from . import NetworkMonitor, NetworkMonitorError
 
 
 class EPollMonitor(NetworkMonitor):
+
+    SUPPORTS_EDGE_TRIGGERED = True
+
     def __new__(cls, *args, **kwargs):
         try:
-            global epoll, EPOLLIN
-            from select import epoll, EPOLLIN
+            global epoll, EPOLLIN, EPOLLOUT, EPOLLET
+            from select import epoll, EPOLLIN, EPOLLOUT, EPOLLET
         except ImportError:
             raise NetworkMonitorError(cls.__name__)
 
-        return super(EPollMonitor, cls).__new__(cls, *args, **kwargs)
+        return super(EPollMonitor, cls).__new__(cls)
 
     def __init__(self, *args, **kwargs):
         super(EPollMonitor, self).__init__(*args, **kwargs)
         self._epoll_monitor = epoll()
-        self._register(self._server.socket)
+        [self._register(fd) for fd in self._server_fds()]
+
+    def _register(self, fd, event_mask=None):
+        self._epoll_monitor.register(fd, event_mask or EPOLLIN)
 
-    def _register(self, fd):
-        self._epoll_monitor.register(fd, EPOLLIN)
+    def _client_event_mask(self):
+        return (EPOLLIN | EPOLLET) if self._edge_triggered else EPOLLIN
 
     def on_disconnect(self, client):
         self._epoll_monitor.unregister(client.socket)
 
+    # The listen socket is always level triggered, otherwise connections left
+    # behind by the accept limit would never be notified again.
     def on_connect(self, client):
-        self._register(client.socket)
+        self._register(client.socket, self._client_event_mask())
+
+    def on_output(self, client):
+        self._epoll_monitor.modify(client.socket, self._client_event_mask() | EPOLLOUT)
+
+    def on_output_flushed(self, client):
+        self._epoll_monitor.modify(client.socket, self._client_event_mask())
 
+    # Any event other than EPOLLOUT (including errors and hang ups) is handled
+    # as a read, so the client gets disconnected if needed.
     def watch(self):
-        ready_fds = [fd for (fd, _) in self._epoll_monitor.poll(self._timeout)]
-        super(EPollMonitor, self)._watch(ready_fds)
+        events = self._epoll_monitor.poll(self._timeout)
+        ready_fds = [fd for (fd, event) in events if event & ~EPOLLOUT]
+        writable_fds = [fd for (fd, event) in events if event & EPOLLOUT]
+        super(EPollMonitor, self)._watch(ready_fds, writable_fds)
@@ -32,7 +32,7 @@ class IOCPMonitor(NetworkMonitor):
         except ImportError:
             raise NetworkMonitorError('IOCPMonitor')
 
-        return super(IOCPMonitor, cls).__new__(cls, *args, **kwargs)
+        return super(IOCPMonitor, cls).__new__(cls)
 
     def __init__(self, *args, **kwargs):
         super(IOCPMonitor, self).__init__(*args, **kwargs)
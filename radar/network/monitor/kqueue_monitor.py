@@ -26,27 +26,42 @@ from . import NetworkMonitor, NetworkMonitorError
 class KQueueMonitor(NetworkMonitor):
     def __new__(cls, *args, **kwargs):
         try:
-            global kqueue, kevent, KQ_EV_ENABLE, KQ_FILTER_READ, KQ_EV_ADD, KQ_EV_DELETE
-            from select import kqueue, kevent, KQ_EV_ENABLE, KQ_FILTER_READ, KQ_EV_ADD, KQ_EV_DELETE
+            global kqueue, kevent, KQ_EV_ENABLE, KQ_EV_DISABLE, KQ_FILTER_READ, KQ_FILTER_WRITE, KQ_EV_ADD, KQ_EV_DELETE
+            from select import kqueue, kevent, KQ_EV_ENABLE, KQ_EV_DISABLE, KQ_FILTER_READ, KQ_FILTER_WRITE, \
+                KQ_EV_ADD, KQ_EV_DELETE
         except ImportError:
             raise NetworkMonitorError(cls.__name__)
 
-        return super(KQueueMonitor, cls).__new__(cls, *args, **kwargs)
+        return super(KQueueMonitor, cls).__new__(cls)
 
     def __init__(self, *args, **kwargs):
         super(KQueueMonitor, self).__init__(*args, **kwargs)
         self._kernel_queue = kqueue()
-        self._register(self._server.socket)
+        [self._register(fd) for fd in self._server_fds()]
 
     def _register(self, fd):
         self._kernel_queue.control([kevent(fd, KQ_FILTER_READ, KQ_EV_ADD | KQ_EV_ENABLE)], 0)
 
     def on_disconnect(self, client):
-        self._kernel_queue.control([kevent(client.socket, KQ_FILTER_READ, KQ_EV_DELETE)], 0)
+        self._kernel_queue.control([
+            kevent(client.socket, KQ_FILTER_READ, KQ_EV_DELETE),
+            kevent(client.socket, KQ_FILTER_WRITE, KQ_EV_DELETE),
+        ], 0)
 
+    # Clients get a disabled write filter that is only enabled while there's
+    # buffered output.
     def on_connect(self, client):
         self._register(client.socket)
+        self._kernel_queue.control([kevent(client.socket, KQ_FILTER_WRITE, KQ_EV_ADD | KQ_EV_DISABLE)], 0)
+
+    def on_output(self, client):
+        self._kernel_queue.control([kevent(client.socket, KQ_FILTER_WRITE, KQ_EV_ENABLE)], 0)
+
+    def on_output_flushed(self, client):
+        self._kernel_queue.control([kevent(client.socket, KQ_FILTER_WRITE, KQ_EV_DISABLE)], 0)
 
     def watch(self):
-        ready_fds = [e.ident for e in self._kernel_queue.control(None, 1, self._timeout)]
-        super(KQueueMonitor, self)._watch(ready_fds)
+        events = self._kernel_queue.control(None, 1, self._timeout)
+        ready_fds = [e.ident for e in events if e.filter == KQ_FILTER_READ]
+        writable_fds = [e.ident for e in events if e.filter == KQ_FILTER_WRITE]
+        super(KQueueMonitor, self)._watch(ready_fds, writable_fds)
@@ -26,17 +26,17 @@ from . import NetworkMonitor, NetworkMonitorError
 class PollMonitor(NetworkMonitor):
     def __new__(cls, *args, **kwargs):
         try:
-            global poll, POLLIN
-            from select import poll, POLLIN
+            global poll, POLLIN, POLLOUT
+            from select import poll, POLLIN, POLLOUT
         except ImportError:
             raise NetworkMonitorError(cls.__name__)
 
-        return super(PollMonitor, cls).__new__(cls, *args, **kwargs)
+        return super(PollMonitor, cls).__new__(cls)
 
     def __init__(self, *args, **kwargs):
         super(PollMonitor, self).__init__(*args, **kwargs)
         self._poll_monitor = poll()
-        self._register(self._server.socket)
+        [self._register(fd) for fd in self._server_fds()]
 
     def _register(self, fd):
         self._poll_monitor.register(fd, POLLIN)
@@ -47,6 +47,14 @@ class PollMonitor(NetworkMonitor):
     def on_connect(self, client):
         self._register(client.socket)
 
+    def on_output(self, client):
+        self._poll_monitor.modify(client.socket, POLLIN | POLLOUT)
+
+    def on_output_flushed(self, client):
+        self._poll_monitor.modify(client.socket, POLLIN)
+
     def watch(self):
-        ready_fds = [fd for (fd, _) in self._poll_monitor.poll(int(self._timeout * 1000))]
-        super(PollMonitor, self)._watch(ready_fds)
+        events = self._poll_monitor.poll(int(self._timeout * 1000))
+        ready_fds = [fd for (fd, event) in events if event & ~POLLOUT]
+        writable_fds = [fd for (fd, event) in events if event & POLLOUT]
+        super(PollMonitor, self)._watch(ready_fds, writable_fds)
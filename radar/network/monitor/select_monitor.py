@@ -31,9 +31,10 @@ class SelectMonitor(NetworkMonitor):
         except ImportError:
             raise NetworkMonitorError(cls.__name__)
 
-        return super(SelectMonitor, cls).__new__(cls, *args, **kwargs)
+        return super(SelectMonitor, cls).__new__(cls)
 
     def watch(self):
-        sockets = [self._server.socket] + [c.socket for c in self._server._clients]
-        ready_fds, _, _ = select([s.fileno() for s in sockets], [], [], self._timeout)
-        super(SelectMonitor, self)._watch(ready_fds)
+        fds = [fd.fileno() for fd in self._server_fds()] + list(self._server._clients)
+        output_fds = [fd for fd, c in self._server._clients.items() if c.has_pending_output()]
+        ready_fds, writable_fds, _ = select(fds, output_fds, [], self._timeout)
+        super(SelectMonitor, self)._watch(ready_fds, writable_fds)
@@ -22,11 +22,14 @@ Copyright 2015 Lucas Liendo.
 
 from abc import ABCMeta, abstractmethod
 from socket import socket, AF_INET, SOCK_STREAM, SOL_SOCKET, SO_REUSEADDR, SOMAXCONN, error as SocketError
-from monitor.select_monitor import SelectMonitor
-from monitor.poll_monitor import PollMonitor
-from monitor.epoll_monitor import EPollMonitor
-from monitor.kqueue_monitor import KQueueMonitor
-from client import ClientReceiveError, ClientSendError, ClientDisconnected, ClientAbortError, Client as BaseClient
+from errno import EWOULDBLOCK, EAGAIN
+from .monitor.select_monitor import SelectMonitor
+from .monitor.poll_monitor import PollMonitor
+from .monitor.epoll_monitor import EPollMonitor
+from .monitor.kqueue_monitor import KQueueMonitor
+from .client import ClientReceiveError, ClientSendError, ClientDisconnected, ClientAbortError, Client as BaseClient
+from ..channel import Channel
+from ..logger import RadarLogger
 from ..platform_setup import Platform
 
 
@@ -58,21 +61,52 @@ class Server(object):
         'Unknown': [SelectMonitor],
     }
 
+    OUTPUT_LIMIT_ACTIONS = ['drop', 'disconnect']
+
     Client = None
 
-    def __init__(self, address, port, network_monitor=None, network_monitor_timeout=None, blocking_socket=True):
+    def __init__(self, address, port, network_monitor=None, network_monitor_timeout=None, blocking_socket=True,
+                 accept_limit=1, edge_triggered=False, output_limit=None, output_limit_action='drop'):
         self.blocking_socket = blocking_socket
+        self.accept_limit = self._validate_accept_limit(accept_limit)
+        self.output_limit = self._validate_output_limit(output_limit)
+        self.output_limit_action = self._validate_output_limit_action(output_limit_action)
         self.socket = None
-        self._clients = []
+        self._clients = {}
+        self._pending_output = Channel(notify=not blocking_socket)
         self._listen(address, port)
-        self.network_monitor = network_monitor or self._get_network_monitor(network_monitor_timeout)
+        self.network_monitor = network_monitor or self._get_network_monitor(network_monitor_timeout, edge_triggered)
+
+    def _validate_accept_limit(self, accept_limit):
+        try:
+            if int(accept_limit) < 1:
+                raise ServerError('Error - Accept limit must be greater than 0.')
+        except ValueError:
+            raise ServerError('Error - \'{:}\' is not a valid accept limit.'.format(accept_limit))
+
+        return int(accept_limit)
+
+    def _validate_output_limit(self, output_limit):
+        try:
+            if (output_limit is not None) and (int(output_limit) < 1):
+                raise ServerError('Error - Output limit must be greater than 0.')
+        except ValueError:
+            raise ServerError('Error - \'{:}\' is not a valid output limit.'.format(output_limit))
+
+        return int(output_limit) if output_limit is not None else None
 
-    def _get_network_monitor(self, network_monitor_timeout):
+    def _validate_output_limit_action(self, output_limit_action):
+        if output_limit_action not in self.OUTPUT_LIMIT_ACTIONS:
+            raise ServerError('Error - \'{:}\' is not a valid output limit action.'.format(output_limit_action))
+
+        return output_limit_action
+
+    def _get_network_monitor(self, network_monitor_timeout, edge_triggered):
         platform = Platform.get_os_type()
 
         for NetworkMonitor in self.AVAILABLE_PLATFORM_MONITORS[platform]:
             try:
-                return NetworkMonitor(self, network_monitor_timeout)
+                return NetworkMonitor(self, network_monitor_timeout, edge_triggered=edge_triggered)
             except KeyError:
                 raise ServerPlatformError('Error - Platform : \'{:}\' is not available.'.format(platform))
             except AttributeError:
@@ -83,9 +117,15 @@ class Server(object):
     def accept_client(self, client):
         return True
 
+    # Non blocking clients write through their output buffers, so sending data
+    # (possibly from other threads) never blocks the server.
     def _on_connect(self, client):
         self.network_monitor.on_connect(client)
-        self._clients.append(client)
+        self._clients[client.socket.fileno()] = client
+
+        if not self.blocking_socket:
+            client.set_output_listener(self._on_output, output_limit=self.output_limit)
+
         self.on_connect(client)
 
     def on_connect(self, client):
@@ -100,7 +140,7 @@ class Server(object):
 
     def disconnect(self, client):
         self.network_monitor.on_disconnect(client)
-        self._clients.remove(client)
+        del self._clients[client.socket.fileno()]
         client.disconnect()
 
     def _on_disconnect(self, client):
@@ -113,7 +153,7 @@ class Server(object):
     def _on_abort(self, client):
         self.network_monitor.on_disconnect(client)
         self.on_abort(client)
-        self._clients.remove(client)
+        del self._clients[client.socket.fileno()]
         client.abort()
 
     def on_abort(self, client):
@@ -133,13 +173,45 @@ class Server(object):
         self.on_receive_error(client, error)
         self.disconnect(client)
 
+    def on_send_error(self, client, error):
+        pass
+
     # In case the user of this class decides to perform a send just after reception.
     def _on_send_error(self, client, error):
         self.on_send_error(client, error)
         self.disconnect(client)
 
+    # Called (from any thread) when a client has buffered output. The client is
+    # handed to the network monitor from the server's own thread, which is
+    # woken up by the channel (if the platform allows watching it).
+    def _on_output(self, client):
+        self._pending_output.put_nowait(client)
+
+    def _is_connected(self, client):
+        return client.is_connected() and (self._clients.get(client.socket.fileno()) is client)
+
+    def _watch_output(self, client):
+        if client.output_overflowed and (self.output_limit_action == 'disconnect'):
+            self._on_send_error(client, ClientSendError('Error - Output limit reached for {:}:{:}.'.format(
+                client.address, client.port)))
+        else:
+            self.network_monitor.on_output(client)
+
+    def _watch_pending_output(self):
+        [self._watch_output(c) for c in set(self._pending_output.drain()) if self._is_connected(c)]
+
+    # Clients that are ready to be written are flushed. Once a client has no
+    # more output the network monitor stops watching it for writing.
+    def _flush_ready_clients(self, clients):
+        for c in clients:
+            try:
+                if c.flush():
+                    self.network_monitor.on_output_flushed(c)
+            except ClientSendError as error:
+                self._on_send_error(c, error)
+
     def on_shutdown(self):
-        [c.disconnect() for c in self._clients]
+        [c.disconnect() for c in list(self._clients.values())]
         self.socket.close()
         self.socket = None
 
@@ -155,14 +227,22 @@ class Server(object):
             self.socket.listen(SOMAXCONN)
         # Can we do : except SocketError as (_, e): ?
         except SocketError as e:
-            raise ServerListenError('Error - Couldn\'t not listen on : {:}/{:}. Details : {:}.'.format(address, port, e[1]))
+            raise ServerListenError('Error - Couldn\'t not listen on : {:}/{:}. Details : {:}.'.format(
+                address, port, e.strerror))
 
+    def _would_block(self, error_code):
+        return (error_code == EWOULDBLOCK or error_code == EAGAIN) and not self.blocking_socket
+
+    # Returns None if there are no more pending connections to accept.
     def _accept(self):
         try:
             client_socket, (address, port) = self.socket.accept()
         # Can we do : except SocketError as (_, e): ?
         except SocketError as e:
-            raise ServerAcceptError('Error - Couldn\'t accept new client. Details : {:}.'.format(e[1]))
+            if self._would_block(e.errno):
+                return None
+
+            raise ServerAcceptError('Error - Couldn\'t accept new client. Details : {:}.'.format(e.strerror))
 
         if not self.blocking_socket:
             client_socket.setblocking(0)
@@ -172,10 +252,35 @@ class Server(object):
 
         return self.Client(address, port, socket=client_socket, blocking_socket=self.blocking_socket)
 
-    def _serve_ready_clients(self, clients):
+    # Accepts pending connections until the listen backlog is drained or the
+    # accept limit is reached. A blocking socket only accepts one connection
+    # at a time, otherwise we would block once the backlog gets empty. Accept
+    # errors (e.g. running out of file descriptors) are logged and accepting
+    # is resumed on the next wakeup.
+    def _accept_clients(self):
+        for _ in range(1 if self.blocking_socket else self.accept_limit):
+            try:
+                client = self._accept()
+            except ServerAcceptError as e:
+                RadarLogger.log(e)
+                break
+
+            if client is None:
+                break
+
+            if self.accept_client(client):
+                self._on_connect(client)
+            else:
+                self._on_reject(client)
+
+    # on_receive returns whether the client may still have unread data. When
+    # draining, on_receive is called until the client's socket would block
+    # (edge triggered network monitors won't notify about that data again).
+    def _serve_ready_clients(self, clients, drain=False):
         for c in clients:
             try:
-                self.on_receive(c)
+                while self.on_receive(c) and drain:
+                    pass
             except ClientReceiveError as error:
                 self._on_receive_error(c, error)
             except ClientSendError as error:
@@ -193,6 +298,7 @@ class Server(object):
 
     def run(self):
         while not self.is_stopped():
+            self._watch_pending_output()
             self.network_monitor.watch()
 
         self.on_shutdown()
@@ -48,7 +48,7 @@ class UnixServerSetup(ServerConfig, UnixSetup):
         [p.configure(self.logger) for p in self.plugins]
 
     def _shutdown_plugins(self):
-        [p.on_shutdown() for p in self.plugins]
+        [p.shutdown() for p in self.plugins]
 
     def configure(self, launcher):
         super(UnixServerSetup, self).configure()
@@ -82,7 +82,7 @@ class WindowsServerSetup(ServerConfig, WindowsSetup):
         [p.configure(self.logger) for p in self.plugins]
 
     def _shutdown_plugins(self):
-        [p.on_shutdown() for p in self.plugins]
+        [p.shutdown() for p in self.plugins]
 
     def configure(self, launcher):
         super(WindowsServerSetup, self).configure()
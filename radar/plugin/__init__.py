@@ -20,12 +20,20 @@ Copyright 2015 Lucas Liendo.
 """
 
 
-from queue import Empty as EmptyQueue
 from abc import ABCMeta
-from ctypes import cast, py_object
-from functools import reduce
+from collections import namedtuple
+from itertools import chain
+from logging import Logger, Handler, DEBUG, INFO
+from multiprocessing import Process, Pipe
+from os import close, fstat, listdir
 from os.path import dirname, join as join_path
-from threading import Thread, Event
+from stat import S_IFMT, S_ISSOCK
+from threading import Thread, Event, Lock
+from time import time
+from queue import Queue, Full as FullQueue, Empty as EmptyQueue
+from ..channel import ChannelClosed
+from ..check import CheckSnapshot
+from ..contact import ContactSnapshot
 from ..logger import RadarLogger
 from ..config import ConfigBuilder, ConfigError
 from ..misc import Switchable
@@ -36,6 +44,48 @@ class ServerPluginError(Exception):
     pass
 
 
+class PluginProcessError(ServerPluginError):
+    pass
+
+
+CheckReply = namedtuple('CheckReply', ['address', 'port', 'checks', 'contacts'])
+
+
+class ReplyEvent(namedtuple('ReplyEvent', ['address', 'port', 'message_type', 'checks', 'contacts'])):
+    """
+    A reply as the RadarServer hands it to the PluginManager. Checks and
+    contacts are snapshots taken when the reply is processed, so an event
+    is immutable and never changes while plugins read it. Use to_tuple to
+    get it as plain tuples (which are cheap to pickle) and from_tuple to
+    get it back.
+    """
+
+    __slots__ = ()
+
+    @staticmethod
+    def _snapshot(objects):
+        return tuple(o.snapshot() for o in chain.from_iterable(o.as_list() for o in objects))
+
+    @classmethod
+    def build(cls, address, port, message_type, checks, contacts):
+        return cls(address, port, message_type, cls._snapshot(checks), cls._snapshot(contacts))
+
+    def to_tuple(self):
+        return (
+            self.address,
+            self.port,
+            self.message_type,
+            tuple(tuple(c) for c in self.checks),
+            tuple(tuple(c) for c in self.contacts),
+        )
+
+    @classmethod
+    def from_tuple(cls, event):
+        address, port, message_type, checks, contacts = event
+        return cls(address, port, message_type, tuple(CheckSnapshot(*c) for c in checks),
+                   tuple(ContactSnapshot(*c) for c in contacts))
+
+
 class ServerPlugin(ConfigBuilder, Switchable):
 
     __metaclass__ = ABCMeta
@@ -43,6 +93,11 @@ class ServerPlugin(ConfigBuilder, Switchable):
     PLUGIN_NAME = ''
     PLUGIN_VERSION = '0.0.1'
     PLUGIN_CONFIG_FILE = ''
+    PLUGIN_WORKERS = 1
+    PLUGIN_QUEUE_SIZE = 1000
+    PLUGIN_BATCH_SIZE = 1
+    PLUGIN_BATCH_INTERVAL = 1
+    PLUGIN_PROCESS = False
     DEFAULT_CONFIG = {}
 
     def __init__(self):
@@ -56,6 +111,11 @@ class ServerPlugin(ConfigBuilder, Switchable):
             self.config = self.DEFAULT_CONFIG
 
         Switchable.__init__(self, enabled=self.config.get('enabled', True))
+        self.workers = self.config.get('workers', self.PLUGIN_WORKERS)
+        self.queue_size = self.config.get('queue size', self.PLUGIN_QUEUE_SIZE)
+        self.batch_size = self.config.get('batch size', self.PLUGIN_BATCH_SIZE)
+        self.batch_interval = self.config.get('batch interval', self.PLUGIN_BATCH_INTERVAL)
+        self.process = self.config.get('process', self.PLUGIN_PROCESS)
         self._message_actions = {
             Message.TYPE['CHECK REPLY']: self.on_check_reply,
             Message.TYPE['TEST REPLY']: self.on_test_reply,
@@ -72,9 +132,17 @@ class ServerPlugin(ConfigBuilder, Switchable):
     def log(self, message):
         RadarLogger.log('Plugin \'{:}\' v{:}. {:}'.format(self.PLUGIN_NAME, self.PLUGIN_VERSION, message))
 
+    # Plugins that run in their own processes are started and shut down
+    # there (see PluginProcess).
     def configure(self, logger):
         RadarLogger.log('Loading plugin : \'{:}\' v{:}.'.format(self.PLUGIN_NAME, self.PLUGIN_VERSION))
-        self.on_start()
+
+        if not self.process:
+            self.on_start()
+
+    def shutdown(self):
+        if not self.process:
+            self.on_shutdown()
 
     def on_start(self):
         """ Implement this method to initialize the plugin. """
@@ -84,6 +152,14 @@ class ServerPlugin(ConfigBuilder, Switchable):
         """ Implement this method to process a check reply. """
         pass
 
+    def on_check_replies(self, replies):
+        """
+        Implement this method to process many check replies at once (each one
+        is a CheckReply). Replies are accumulated until batch size replies
+        arrive or batch interval seconds elapse.
+        """
+        [self.on_check_reply(*r) for r in replies]
+
     def on_test_reply(self, address, port, checks, contacts):
         """ Implement this method to process a test reply. """
         pass
@@ -100,50 +176,360 @@ class ServerPlugin(ConfigBuilder, Switchable):
             (self.PLUGIN_VERSION == other_plugin.PLUGIN_VERSION)
 
 
-class PluginManager(Thread):
+class _CollectingHandler(Handler):
+    def __init__(self, records):
+        Handler.__init__(self)
+        self._records = records
 
-    STOP_EVENT_TIMEOUT = 0.2
+    def emit(self, record):
+        self._records.append((record.levelname, record.getMessage()))
 
-    def __init__(self, platform_setup, queue, stop_event=None):
-        Thread.__init__(self)
-        self._plugins = platform_setup.plugins
-        self._queue = queue
-        self.stop_event = stop_event or Event()
 
-    # We dereference ids, to avoid re-instantiating objects. We can actually
-    # do this because we're on the same process address space.
-    def _dereference(self, ids):
-        return [cast(object_id, py_object).value for object_id in ids]
+# Every plugin gets its own lists, so they're free to modify them.
+def _run_plugin(plugin, event):
+    plugin.run(event.address, event.port, event.message_type, list(event.checks), list(event.contacts))
 
-    def _flatten(self, list_of_lists):
-        return reduce(lambda l, m: l + m, list_of_lists)
 
-    def _get_plugin_args(self, message):
-        return (
-            message['address'],
-            message['port'],
-            message['message_type'],
-            self._flatten([c.as_list() for c in self._dereference(message['check_ids'])]),
-            self._flatten([c.as_list() for c in self._dereference(message['contact_ids'])]),
-        )
+def _to_check_reply(event):
+    return CheckReply(event.address, event.port, list(event.checks), list(event.contacts))
 
-    def is_stopped(self):
-        return self.stop_event.is_set()
 
-    def _run_plugin(self, plugin, address, port, message_type, checks, contacts):
+# Windows plugin processes aren't forked, so there's nothing to list there.
+def _inherited_fds():
+    for path in ['/proc/self/fd', '/dev/fd']:
         try:
-            plugin.run(address, port, message_type, checks, contacts)
+            return [int(fd) for fd in listdir(path)]
+        except OSError:
+            pass
+
+    return []
+
+
+# Plugin processes are forked from the RadarServer, so they inherit its
+# listening socket, its network monitor and every client socket. Those are
+# closed right away, otherwise the server closing a client wouldn't really
+# close the connection. Files and pipes (which multiprocessing relies on)
+# are kept.
+def _close_inherited_sockets(connection_fd):
+    for fd in _inherited_fds():
+        if (fd <= 2) or (fd == connection_fd):
+            continue
+
+        try:
+            mode = fstat(fd).st_mode
+
+            if S_ISSOCK(mode) or (S_IFMT(mode) == 0):
+                close(fd)
+        except OSError:
+            pass
+
+
+# This is what runs in a plugin process. Every request is answered with the
+# messages the plugin logged meanwhile and the error it raised (if any), a
+# None request stops the process.
+def _host_plugin(Plugin, connection, log_level):
+    _close_inherited_sockets(connection.fileno())
+    records = []
+    logger = Logger('radar-plugin', level=log_level)
+    logger.addHandler(_CollectingHandler(records))
+    RadarLogger._shared_state['logger'] = logger
+    plugin = Plugin()
+    actions = {
+        'on_start': plugin.on_start,
+        'run': lambda event: _run_plugin(plugin, ReplyEvent.from_tuple(event)),
+        'on_check_replies': lambda events: plugin.on_check_replies(
+            [_to_check_reply(ReplyEvent.from_tuple(e)) for e in events]),
+        'on_shutdown': plugin.on_shutdown,
+    }
+    request = connection.recv()
+
+    while request is not None:
+        action, args = request
+        error = None
+
+        try:
+            actions[action](*args)
         except Exception as e:
-            RadarLogger.log('Error - Plugin \'{:}\' version \'{:}\' raised an error. Details : {:}.'.format(
-                plugin.PLUGIN_NAME, plugin.PLUGIN_VERSION, e))
+            error = str(e)
+
+        connection.send((list(records), error))
+        del records[:]
+        request = connection.recv()
+
+
+class PluginProcess(object):
+    """
+    Runs a plugin in a separate process, so CPU bound plugins don't compete
+    with the RadarServer for the interpreter. Replies are sent to the plugin
+    process through a pipe as plain tuples (see ReplyEvent.to_tuple) and every
+    message the plugin logs is sent back and logged here. If the plugin
+    process dies it is started again.
+    """
+
+    STOP_TIMEOUT = 5
+    LOG_ACTIONS = {
+        'INFO': RadarLogger.log,
+        'DEBUG': RadarLogger.debug,
+    }
+
+    def __init__(self, Plugin):
+        self._Plugin = Plugin
+        self._process = None
+        self._connection = None
+        self._start()
+
+    def _describe(self):
+        return 'Plugin \'{:}\' version \'{:}\''.format(self._Plugin.PLUGIN_NAME, self._Plugin.PLUGIN_VERSION)
+
+    def _start(self):
+        self._connection, child_connection = Pipe()
+        log_level = DEBUG if RadarLogger.is_enabled_for('debug') else INFO
+        self._process = Process(target=_host_plugin, args=(self._Plugin, child_connection, log_level))
+        self._process.daemon = True
+        self._process.start()
+        child_connection.close()
 
-    def _run_plugins(self, queue_message):
-        plugin_args = self._get_plugin_args(queue_message)
-        [self._run_plugin(p, *plugin_args) for p in self._plugins if p.enabled]
+        try:
+            self._call('on_start')
+        except ServerPluginError as e:
+            RadarLogger.log(e)
 
-    def run(self):
-        while not self.is_stopped():
+    def _restart(self):
+        self._connection.close()
+        self._process.join(self.STOP_TIMEOUT)
+        RadarLogger.log('Error - {:} process (pid {:}) died with exit code {:}, starting it again.'.format(
+            self._describe(), self._process.pid, self._process.exitcode))
+        self._start()
+
+    def _log(self, records):
+        [self.LOG_ACTIONS.get(level, RadarLogger.log)(message) for level, message in records]
+
+    def _call(self, action, *args):
+        try:
+            self._connection.send((action, args))
+            records, error = self._connection.recv()
+        except (EOFError, IOError, OSError):
+            raise PluginProcessError('Error - {:} process died while running \'{:}\'.'.format(
+                self._describe(), action))
+
+        self._log(records)
+
+        if error is not None:
+            raise ServerPluginError(error)
+
+    # Only replies restart a dead process, so a plugin that dies while starting
+    # up isn't restarted in a loop.
+    def _request(self, action, *args):
+        try:
+            self._call(action, *args)
+        except PluginProcessError:
+            self._restart()
+            raise
+
+    def run(self, address, port, message_type, checks, contacts):
+        self._request('run', ReplyEvent(address, port, message_type, tuple(checks), tuple(contacts)).to_tuple())
+
+    def on_check_replies(self, replies):
+        self._request('on_check_replies', [
+            ReplyEvent(r.address, r.port, Message.TYPE['CHECK REPLY'], tuple(r.checks), tuple(r.contacts)).to_tuple()
+            for r in replies
+        ])
+
+    def stop(self):
+        try:
+            self._call('on_shutdown')
+            self._connection.send(None)
+        except (ServerPluginError, IOError, OSError) as e:
+            RadarLogger.log(e)
+
+        self._process.join(self.STOP_TIMEOUT)
+
+        if self._process.is_alive():
+            self._process.terminate()
+
+        self._connection.close()
+
+
+class PluginWorker(object):
+    """
+    Runs a single plugin from its own threads. Replies are handed to them
+    through a bounded queue, when the queue is full replies are dropped (and
+    the amount of dropped replies is logged later on) so a slow plugin never
+    delays the rest of the plugins. Check replies are delivered in batches
+    of up to batch size replies, a batch is also delivered when batch interval
+    seconds elapse since its first reply arrived.
+    """
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+        self._queue = Queue(maxsize=self._validate_queue_size(plugin.queue_size))
+        self._batch_size = self._validate_batch_size(plugin.batch_size)
+        self._batch_interval = self._validate_batch_interval(plugin.batch_interval)
+        self._threads = [Thread(target=self._work) for _ in range(self._validate_workers(plugin.workers))]
+        self.dropped = 0
+        self._unreported_drops = 0
+        self._dropped_lock = Lock()
+
+    def _describe(self):
+        return 'Plugin \'{:}\' version \'{:}\''.format(self.plugin.PLUGIN_NAME, self.plugin.PLUGIN_VERSION)
+
+    def _validate_workers(self, workers):
+        try:
+            if int(workers) < 1:
+                raise ServerPluginError('Error - {:} needs at least one worker.'.format(self._describe()))
+        except ValueError:
+            raise ServerPluginError('Error - \'{:}\' is not a valid number of workers for {:}.'.format(
+                workers, self._describe()))
+
+        return int(workers)
+
+    def _validate_queue_size(self, queue_size):
+        try:
+            if int(queue_size) < 1:
+                raise ServerPluginError('Error - {:} queue size must be greater than 0.'.format(self._describe()))
+        except ValueError:
+            raise ServerPluginError('Error - \'{:}\' is not a valid queue size for {:}.'.format(
+                queue_size, self._describe()))
+
+        return int(queue_size)
+
+    def _validate_batch_size(self, batch_size):
+        try:
+            if int(batch_size) < 1:
+                raise ServerPluginError('Error - {:} batch size must be greater than 0.'.format(self._describe()))
+        except ValueError:
+            raise ServerPluginError('Error - \'{:}\' is not a valid batch size for {:}.'.format(
+                batch_size, self._describe()))
+
+        return int(batch_size)
+
+    def _validate_batch_interval(self, batch_interval):
+        try:
+            if float(batch_interval) <= 0:
+                raise ServerPluginError('Error - {:} batch interval must be greater than 0.'.format(self._describe()))
+        except ValueError:
+            raise ServerPluginError('Error - \'{:}\' is not a valid batch interval for {:}.'.format(
+                batch_interval, self._describe()))
+
+        return float(batch_interval)
+
+    def start(self):
+        [t.start() for t in self._threads]
+
+    # Returns whether the plugin will get the reply.
+    def put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except FullQueue:
+            with self._dropped_lock:
+                self.dropped += 1
+                self._unreported_drops += 1
+
+            return False
+
+        return True
+
+    def _report_drops(self):
+        with self._dropped_lock:
+            dropped, self._unreported_drops = self._unreported_drops, 0
+
+        if dropped:
+            RadarLogger.log('Error - {:} dropped {:} replies (its queue was full).'.format(self._describe(), dropped))
+
+    def _run_plugin(self, plugin, event):
+        try:
+            _run_plugin(plugin, event)
+        except Exception as e:
+            RadarLogger.log('Error - {:} raised an error. Details : {:}.'.format(self._describe(), e))
+
+    def _deliver_batch(self, plugin, batch):
+        try:
+            plugin.on_check_replies(batch)
+        except Exception as e:
+            RadarLogger.log('Error - {:} raised an error. Details : {:}.'.format(self._describe(), e))
+
+    def _get_timeout(self, batch_deadline):
+        return None if batch_deadline is None else max(batch_deadline - time(), 0)
+
+    def _add_to_batch(self, batch, event):
+        batch.append(_to_check_reply(event))
+
+    # Plugins flagged to run in their own processes get one process per
+    # worker, any other plugin is run from the worker's thread.
+    def _start_plugin(self):
+        return PluginProcess(self.plugin.__class__) if self.plugin.process else self.plugin
+
+    def _stop_plugin(self, plugin):
+        if plugin is not self.plugin:
+            plugin.stop()
+
+    # A None item stops a worker. Each worker keeps its own batch of check
+    # replies, a pending batch is delivered before stopping.
+    def _work(self):
+        plugin = self._start_plugin()
+        batch, batch_deadline = [], None
+
+        while True:
             try:
-                self._run_plugins(self._queue.get_nowait())
+                event = self._queue.get(timeout=self._get_timeout(batch_deadline))
             except EmptyQueue:
-                self.stop_event.wait(self.STOP_EVENT_TIMEOUT)
+                self._deliver_batch(plugin, batch)
+                batch, batch_deadline = [], None
+                continue
+
+            if event is None:
+                break
+
+            self._report_drops()
+
+            if event.message_type != Message.TYPE['CHECK REPLY']:
+                self._run_plugin(plugin, event)
+            else:
+                self._add_to_batch(batch, event)
+                batch_deadline = batch_deadline or (time() + self._batch_interval)
+
+            # The queue might never get empty, so the batch interval is also
+            # checked after every reply.
+            if batch and ((len(batch) >= self._batch_size) or (time() >= batch_deadline)):
+                self._deliver_batch(plugin, batch)
+                batch, batch_deadline = [], None
+
+        if batch:
+            self._deliver_batch(plugin, batch)
+
+        self._stop_plugin(plugin)
+        self._report_drops()
+
+    # Replies already queued are processed before the workers stop.
+    def stop(self):
+        [self._queue.put(None) for _ in self._threads]
+        [t.join() for t in self._threads]
+
+
+class PluginManager(Thread):
+    def __init__(self, platform_setup, queue, stop_event=None):
+        Thread.__init__(self)
+        self._workers = [PluginWorker(p) for p in platform_setup.plugins]
+        self._queue = queue
+        self.stop_event = stop_event or Event()
+
+    def is_stopped(self):
+        return self.stop_event.is_set()
+
+    # Every plugin runs from its own workers, this thread only hands them
+    # the replies.
+    def _run_plugins(self, event):
+        [w.put(event) for w in self._workers if w.plugin.enabled]
+
+    # Blocks until a reply arrives, the channel gets closed when the server
+    # stops.
+    def run(self):
+        [w.start() for w in self._workers]
+
+        try:
+            while not self.is_stopped():
+                self._run_plugins(self._queue.get())
+        except ChannelClosed:
+            pass
+
+        [w.stop() for w in self._workers]
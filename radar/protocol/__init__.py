@@ -20,8 +20,8 @@ Copyright 2015 Lucas Liendo.
 """
 
 
-from io import BytesIO
-from struct import pack, unpack, calcsize
+from struct import pack, unpack_from, calcsize
+from zlib import compress, decompressobj, error as ZlibError
 from ..network.client import ClientDataNotReady, ClientAbortError
 
 
@@ -34,7 +34,9 @@ class Message(object):
     HEADER_FORMAT = '!BBH'
     HEADER_SIZE = calcsize(HEADER_FORMAT)
     MAX_PAYLOAD_SIZE = 65536
+    MAX_DECOMPRESSED_SIZE = 16 * MAX_PAYLOAD_SIZE
     PAYLOAD_FORMAT = '{:}s'
+    RECEIVE_BUFFER_SIZE = 8192
 
     TYPE = {
         'TEST': 0,
@@ -48,79 +50,202 @@ class Message(object):
         'COMPRESS': 0x01,
     }
 
-    # TODO: Use just one buffer ?
+    TYPE_NAMES = dict(zip(TYPE.values(), TYPE.keys()))
+    OPTIONS_VALUES = frozenset(OPTIONS.values())
+
+    COMPRESSIBLE_TYPES = [TYPE['CHECK'], TYPE['CHECK REPLY']]
+
+    # Compression settings are shared by all messages. Compressed messages are
+    # always inflated on reception, compression only applies when sending.
+    _shared_state = {
+        'compress': False,
+        'compress threshold': 1024,
+    }
+
+    # Every connection uses a single receive buffer. Received bytes live between
+    # the start and end offsets and complete messages are parsed right from it.
     def __init__(self):
-        self.header = BytesIO()
-        self.payload = BytesIO()
+        self._set_buffer(bytearray(self.RECEIVE_BUFFER_SIZE))
+        self._start = 0
+        self._end = 0
+        self._would_block = False
 
     @staticmethod
     def get_type(message_type):
-        return list(Message.TYPE)[list(Message.TYPE.values()).index(message_type)]
+        return Message.TYPE_NAMES[message_type]
 
-    def _header_received(self):
-        return len(self.header.getvalue()) == self.HEADER_SIZE
-
-    def _payload_received(self, payload_size):
-        return len(self.payload.getvalue()) == payload_size
-
-    def _unpack_header(self, header):
-        return unpack(self.HEADER_FORMAT, header)
+    @staticmethod
+    def configure(compress=False, compress_threshold=1024):
+        Message._shared_state.update({
+            'compress': compress,
+            'compress threshold': compress_threshold,
+        })
+
+    def _set_buffer(self, buffer):
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+
+    def _buffered_size(self):
+        return self._end - self._start
+
+    @classmethod
+    def _should_compress(cls, message_type, message):
+        return cls._shared_state['compress'] and (message_type in cls.COMPRESSIBLE_TYPES) and \
+            (len(message) > cls._shared_state['compress threshold'])
+
+    @classmethod
+    def _pack(cls, message_type, message_options, message):
+        if cls._should_compress(message_type, message):
+            message = compress(message)
+            message_options |= cls.OPTIONS['COMPRESS']
 
-    def _pack(self, message_type, message_options, message):
         message_length = len(message)
-        pack_format = (self.HEADER_FORMAT + self.PAYLOAD_FORMAT).format(message_length)
+        pack_format = (cls.HEADER_FORMAT + cls.PAYLOAD_FORMAT).format(message_length)
         return pack(pack_format, message_type, message_options, message_length, message)
 
-    # TODO: Better way ? _receive_header & _receive_payload are one and the same...
-    # Will it help to use a single buffer ?
-    def _receive_header(self, client):
-        if not self._header_received():
-            try:
-                received_bytes = client.receive(self.HEADER_SIZE - len(self.header.getvalue()))
-                self.header.write(received_bytes)
-            except ClientDataNotReady:
-                raise MessageNotReady()
+    # Packs a message so it can be sent as many times as needed (using
+    # send_packed) without being packed again.
+    @classmethod
+    def pack(cls, message_type, message, message_options=OPTIONS['NONE']):
+        return cls._pack(message_type, message_options, message)
 
-            if not self._header_received():
-                raise MessageNotReady()
+    def _unpack_header(self):
+        return unpack_from(self.HEADER_FORMAT, self._buffer, self._start)
 
-        return self.header.getvalue()
+    def _invalid_header(self, message_type, message_options, payload_size):
+        return (message_type not in self.TYPE_NAMES) or (message_options not in self.OPTIONS_VALUES) or \
+            payload_size == 0
+
+    def _reset_buffer(self):
+        self._start = 0
+        self._end = 0
+
+    # Size of the message we're currently waiting for (or just its header if
+    # it hasn't been received yet).
+    def _pending_message_size(self):
+        if self._buffered_size() < self.HEADER_SIZE:
+            return self.HEADER_SIZE
+
+        _, _, payload_size = self._unpack_header()
+        return self.HEADER_SIZE + payload_size
+
+    # Moves the unparsed bytes to the beginning of the buffer. A bigger buffer
+    # is only allocated if the pending message doesn't fit in the current one.
+    def _compact_buffer(self, pending_message_size):
+        buffered_size = self._buffered_size()
+
+        if pending_message_size > len(self._buffer):
+            buffer = bytearray(max(pending_message_size, 2 * len(self._buffer)))
+            buffer[:buffered_size] = self._buffer[self._start:self._end]
+            self._set_buffer(buffer)
+        elif buffered_size > 0:
+            self._buffer[:buffered_size] = self._buffer[self._start:self._end]
+
+        self._start = 0
+        self._end = buffered_size
+
+    def _receive(self, client):
+        pending_message_size = self._pending_message_size()
+
+        if (self._start + pending_message_size > len(self._buffer)) or (self._end == len(self._buffer)):
+            self._compact_buffer(pending_message_size)
+        elif self._buffered_size() == 0:
+            self._reset_buffer()
+
+        try:
+            self._end += client.receive_into(self._view[self._end:])
+            self._would_block = False
+        except ClientDataNotReady:
+            self._would_block = True
+
+    # Whether the last reception found no data available, that is : the socket
+    # has been drained.
+    def would_block(self):
+        return self._would_block
+
+    # Returns the next complete message in the buffer or None if there isn't
+    # one. The payload is a view on the receive buffer (no copies are made
+    # unless the payload has to be decompressed).
+    def _next_message(self):
+        if self._buffered_size() < self.HEADER_SIZE:
+            return None
+
+        message_type, message_options, payload_size = self._unpack_header()
 
-    def _receive_payload(self, client, payload_size):
-        if not self._payload_received(payload_size):
-            try:
-                received_bytes = client.receive(payload_size - len(self.payload.getvalue()))
-                self.payload.write(received_bytes)
-            except ClientDataNotReady:
-                raise MessageNotReady()
+        if self._invalid_header(message_type, message_options, payload_size):
+            self._reset_buffer()
+            raise ClientAbortError()
 
-            if not self._payload_received(payload_size):
-                raise MessageNotReady()
+        message_end = self._start + self.HEADER_SIZE + payload_size
 
-        return self.payload.getvalue()
+        if message_end > self._end:
+            return None
 
-    def _reset_buffers(self):
-        self.header = BytesIO()
-        self.payload = BytesIO()
+        payload = self._view[self._start + self.HEADER_SIZE:message_end]
+        self._start = message_end
 
-    def _invalid_header(self, message_type, message_options, payload_size):
-        return (message_type not in list(self.TYPE.values())) or \
-            (message_options not in list(self.OPTIONS.values())) or payload_size == 0
+        if message_options & self.OPTIONS['COMPRESS']:
+            payload = self._decompress(payload)
 
-    def receive(self, client):
-        message_type, message_options, payload_size = self._unpack_header(self._receive_header(client))
+        return message_type, payload
 
-        if self._invalid_header(message_type, message_options, payload_size):
-            self._reset_buffers()
+    # A compressed payload is never inflated beyond MAX_DECOMPRESSED_SIZE bytes,
+    # otherwise a tiny message could make us allocate huge amounts of memory.
+    # Peers sending bigger payloads get their connection aborted.
+    def _decompress(self, payload):
+        decompressor = decompressobj()
+
+        try:
+            decompressed_payload = decompressor.decompress(payload.tobytes(), self.MAX_DECOMPRESSED_SIZE)
+        except ZlibError:
             raise ClientAbortError()
 
-        payload = self._receive_payload(client, payload_size)
-        self._reset_buffers()
+        if decompressor.unconsumed_tail:
+            raise ClientAbortError()
 
-        return message_type, payload
+        return memoryview(decompressed_payload)
+
+    def _next_messages(self):
+        messages = []
+        message = self._next_message()
+
+        while message is not None:
+            messages.append(message)
+            message = self._next_message()
+
+        return messages
+
+    # The socket is only read if there isn't a complete message already in the
+    # buffer. Returned payloads are only valid until the next reception.
+    def receive(self, client):
+        message = self._next_message()
+
+        if message is None:
+            self._receive(client)
+            message = self._next_message()
+
+        if message is None:
+            raise MessageNotReady()
+
+        return message
+
+    # Same as receive but returns all complete messages found in one reception.
+    def receive_messages(self, client):
+        messages = self._next_messages()
+
+        if not messages:
+            self._receive(client)
+            messages = self._next_messages()
+
+        if not messages:
+            raise MessageNotReady()
+
+        return messages
 
     def send(self, client, message_type, message, message_options=OPTIONS['NONE']):
-        packed_message = self._pack(message_type, message_options, message)
+        return self.send_packed(client, self._pack(message_type, message_options, message))
+
+    def send_packed(self, client, packed_message):
         message_length = len(packed_message)
         sent_bytes = 0
 
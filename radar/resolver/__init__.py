@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from time import time
+from threading import Lock
+from socket import gethostbyname
+from multiprocessing.pool import ThreadPool
+from ..logger import RadarLogger
+
+
+class HostnameResolverError(Exception):
+    pass
+
+
+class HostnameResolver(object):
+    """
+    This class resolves hostnames concurrently (using a pool of threads) and
+    caches their addresses for a given amount of time (ttl). Expired entries
+    keep their last known address until refresh resolves them again, so
+    lookups never wait on a name server.
+    """
+
+    def __init__(self, workers=8, ttl=300, resolve=gethostbyname):
+        self._workers = self._validate_workers(workers)
+        self.ttl = self._validate_ttl(ttl)
+        self._resolve = resolve
+        self._cache = {}
+        self._lock = Lock()
+
+    def _validate_workers(self, workers):
+        try:
+            if int(workers) < 1:
+                raise HostnameResolverError('Error - Resolver workers must be greater than 0.')
+        except ValueError:
+            raise HostnameResolverError('Error - \'{:}\' is not a valid number of resolver workers.'.format(workers))
+
+        return int(workers)
+
+    def _validate_ttl(self, ttl):
+        try:
+            if float(ttl) < 1:
+                raise HostnameResolverError('Error - Resolver ttl must be greater than 1 sec.')
+        except ValueError:
+            raise HostnameResolverError('Error - \'{:}\' is not a valid resolver ttl.'.format(ttl))
+
+        return float(ttl)
+
+    def _resolve_hostname(self, hostname):
+        try:
+            return hostname, self._resolve(hostname)
+        except Exception as e:
+            RadarLogger.log('Error - Couldn\'t resolve hostname \'{:}\'. Details : {:}.'.format(hostname, e))
+
+        return hostname, None
+
+    def _resolve_hostnames(self, hostnames):
+        pool = ThreadPool(min(self._workers, len(hostnames)))
+
+        try:
+            return pool.map(self._resolve_hostname, hostnames)
+        finally:
+            pool.close()
+            pool.join()
+
+    # Returns the hostnames whose address changed. Hostnames that couldn't be
+    # resolved keep their last known address (and will be retried).
+    def _update(self, resolved_hostnames):
+        expiry = time() + self.ttl
+        updated_hostnames = set()
+
+        with self._lock:
+            for hostname, address in [(h, a) for h, a in resolved_hostnames if a is not None]:
+                if self._cache.get(hostname, (None, None))[0] != address:
+                    updated_hostnames.add(hostname)
+
+                self._cache[hostname] = (address, expiry)
+
+        return updated_hostnames
+
+    def resolve(self, hostnames):
+        unresolved_hostnames = [h for h in set(hostnames) if h not in self._cache]
+        return self._update(self._resolve_hostnames(unresolved_hostnames)) if unresolved_hostnames else set()
+
+    def lookup(self, hostname):
+        if hostname not in self._cache:
+            self.resolve([hostname])
+
+        try:
+            return self._cache[hostname][0]
+        except KeyError:
+            raise HostnameResolverError('Error - Couldn\'t resolve hostname \'{:}\'.'.format(hostname))
+
+    def _expired_hostnames(self, now):
+        with self._lock:
+            return [h for h, (_, expiry) in self._cache.items() if expiry <= now]
+
+    def refresh(self):
+        expired_hostnames = self._expired_hostnames(time())
+        return self._update(self._resolve_hostnames(expired_hostnames)) if expired_hostnames else set()
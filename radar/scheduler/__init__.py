@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from heapq import heappush, heappop
+from itertools import count
+from random import uniform
+from zlib import crc32
+
+
+class PollScheduler(object):
+    """
+    This class keeps every check (or check group) in a heap ordered by
+    the next time it has to be polled. Checks without their own interval
+    are polled every default interval. Jitter is added on top of every
+    scheduled time without shifting the check's cadence.
+
+    If more than one slot is given every check is scheduled once per slot
+    and slots are evenly spread across the check's interval, so clients
+    assigned to different slots are polled at different times.
+    """
+
+    def __init__(self, checks, default_interval, start_time, slots=1):
+        self._default_interval = default_interval
+        self._slots = slots
+        self._sequence = count()
+        self._heap = []
+        [self._schedule(c, start_time + self._get_offset(c, s), s) for c in checks for s in range(slots)]
+
+    @staticmethod
+    def get_slot(address, slots):
+        return (crc32(address.encode('utf-8')) & 0xffffffff) % slots
+
+    def _get_interval(self, check):
+        return check.interval or self._default_interval
+
+    def _get_offset(self, check, slot):
+        return slot * self._get_interval(check) / self._slots
+
+    def _get_jitter(self, check):
+        return uniform(0, check.jitter) if check.jitter else 0
+
+    def _schedule(self, check, scheduled_time, slot):
+        heappush(self._heap, (scheduled_time + self._get_jitter(check), next(self._sequence), scheduled_time, check, slot))
+
+    # If we fell behind more than a whole interval, the check is rescheduled
+    # from now on instead of being polled repeatedly to catch up.
+    def _reschedule(self, check, scheduled_time, slot, now):
+        next_time = scheduled_time + self._get_interval(check)
+        self._schedule(check, next_time if next_time > now else now + self._get_interval(check), slot)
+
+    def next_poll_time(self):
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        due_checks = {}
+
+        while self._heap and self._heap[0][0] <= now:
+            _, _, scheduled_time, check, slot = heappop(self._heap)
+            due_checks.setdefault(slot, []).append(check)
+            self._reschedule(check, scheduled_time, slot, now)
+
+        return due_checks
@@ -21,13 +21,16 @@ Copyright 2015 Lucas Liendo.
 
 
 from queue import Full as FullQueue
-from datetime import datetime, timedelta
+from datetime import datetime
+from time import time
 from json import loads as deserialize_json
 from threading import Thread, Event
 from ..logger import RadarLogger
 from ..client import RadarClientLite
 from ..network.server import Server
+from ..plugin import ReplyEvent
 from ..protocol import MessageNotReady
+from ..scheduler import PollScheduler
 
 
 class ServerPollerError(Exception):
@@ -47,6 +50,10 @@ class RadarServer(Server, Thread):
             platform_setup.config['listen']['port'],
             network_monitor_timeout=self.NETWORK_MONITOR_TIMEOUT,
             blocking_socket=False,
+            accept_limit=platform_setup.config['listen']['accept limit'],
+            edge_triggered=platform_setup.config['listen']['edge triggered'],
+            output_limit=platform_setup.config['listen']['output limit'],
+            output_limit_action=platform_setup.config['listen']['output limit action'],
         )
         self._client_manager = client_manager
         self._queue = queue
@@ -72,34 +79,48 @@ class RadarServer(Server, Thread):
         RadarLogger.log('Error - Client {:}:{:} sent an unknown message. Resetting connection.'.format(
             client.address, client.port))
 
+    # Checks and contacts are copied right away, the PluginManager may run
+    # after they get updated again.
     def _write_queue(self, client, message_type, updated_checks):
-        queue_message = {
-            'address': client.address,
-            'port': client.port,
-            'message_type': message_type,
-            'check_ids': [id(c) for c in updated_checks['checks']],
-            'contact_ids': [id(c) for c in updated_checks['contacts']]
-        }
+        event = ReplyEvent.build(client.address, client.port, message_type, updated_checks['checks'],
+                                 updated_checks['contacts'])
 
         try:
-            self._queue.put_nowait(queue_message)
+            self._queue.put_nowait(event)
         except FullQueue as e:
             RadarLogger.log('Error - Couldn\'t write to queue. Details : {:}.'.format(e))
 
+    def _process_message(self, client, message_type, message):
+        deserialized_message = deserialize_json(message.tobytes())
+        updated_checks = self._client_manager.process_message(client, message_type, deserialized_message)
+        [self._write_queue(client, message_type, uc) for uc in updated_checks]
+
+    # Returns whether the client may still have unread data, this allows the
+    # server to keep reading from a client until its socket is drained (even
+    # if a message spans many receptions).
     def on_receive(self, client):
         try:
-            message_type, message = client.receive_message()
-            deserialized_message = deserialize_json(message)
-            updated_checks = self._client_manager.process_message(client, message_type, deserialized_message)
-            [self._write_queue(client, message_type, uc) for uc in updated_checks]
+            [self._process_message(client, message_type, message) for message_type, message in client.receive_messages()]
         except MessageNotReady:
             pass
 
+        return not client.would_block()
+
     def on_receive_error(self, client, error):
         self._client_manager.unregister(client)
         RadarLogger.log('Error - While receiving data from client {:}:{:}. Details: {:}'.format(
             client.address, client.port, error))
 
+    def on_send_error(self, client, error):
+        self._client_manager.unregister(client)
+        RadarLogger.log('Error - While sending data to client {:}:{:}. Details: {:}'.format(
+            client.address, client.port, error))
+
+    # Closing the channel wakes up the PluginManager so it can finish too.
+    def on_shutdown(self):
+        super(RadarServer, self).on_shutdown()
+        self._queue.close()
+
     def is_stopped(self):
         return self.stop_event.is_set()
 
@@ -109,6 +130,8 @@ class RadarServerPoller(Thread):
         Thread.__init__(self)
         self._client_manager = client_manager
         self._polling_time = self._validate(platform_setup.config['polling time'])
+        self._poll_slots = self._validate_poll_slots(platform_setup.config['poll slots'])
+        self._scheduler = None
         self.stop_event = stop_event or Event()
 
     def _validate(self, polling_time):
@@ -120,15 +143,62 @@ class RadarServerPoller(Thread):
 
         return float(polling_time)
 
+    def _validate_poll_slots(self, poll_slots):
+        try:
+            if int(poll_slots) < 1:
+                raise ServerPollerError('Error - Poll slots must be greater than 0.')
+        except ValueError:
+            raise ServerPollerError('Error - \'{:}\' is not a valid number of poll slots.'.format(poll_slots))
+
+        return int(poll_slots)
+
     def _log_next_poll(self):
-        time = (datetime.now() + timedelta(0, self._polling_time)).strftime('%H:%M:%S')
-        RadarLogger.log('Next scheduled poll at : {:}.'.format(time))
+        next_poll_time = datetime.fromtimestamp(self._scheduler.next_poll_time()).strftime('%H:%M:%S')
+        RadarLogger.log('Next scheduled poll at : {:}.'.format(next_poll_time))
 
-    def run(self):
-        while not self.is_stopped():
-            self._client_manager.poll()
+    # Every check (or check group) is polled on its own interval (or every
+    # polling time if it doesn't define one). All checks that are due at the
+    # same time are polled together. When polls are staggered, every slot
+    # only polls the clients assigned to it.
+    def _poll(self):
+        due_checks = self._scheduler.pop_due(time())
+
+        for slot, checks in due_checks.items():
+            self._client_manager.poll(checks=checks, slot=slot, slots=self._poll_slots)
+
+        if due_checks:
             self._log_next_poll()
-            self.stop_event.wait(self._polling_time)
+
+    def run(self):
+        self._scheduler = PollScheduler(self._client_manager.get_checks(), self._polling_time, time(),
+                                        slots=self._poll_slots)
+
+        while not self.is_stopped() and self._scheduler.next_poll_time() is not None:
+            self._poll()
+            self.stop_event.wait(max(self._scheduler.next_poll_time() - time(), 0))
+
+    def is_stopped(self):
+        return self.stop_event.is_set()
+
+
+class RadarServerResolver(Thread):
+    def __init__(self, client_manager, platform_setup, stop_event=None):
+        Thread.__init__(self)
+        self._client_manager = client_manager
+        self._refresh_time = platform_setup.resolver.ttl
+        self.stop_event = stop_event or Event()
+
+    def _refresh(self):
+        hostnames = self._client_manager.refresh_hostnames()
+
+        if hostnames:
+            RadarLogger.log('Updated addresses of hosts : {:}.'.format(', '.join(sorted(hostnames))))
+
+    # Hostnames are refreshed in the background so clients never wait for
+    # a name server when they connect.
+    def run(self):
+        while not self.stop_event.wait(self._refresh_time):
+            self._refresh()
 
     def is_stopped(self):
         return self.stop_event.is_set()
@@ -51,3 +51,12 @@ class TestAddress(TestCase):
     @raises(AddressError)
     def test_address_raises_address_error_exception(self):
         Address('*invalid hostname*')
+
+    def test_address_to_int(self):
+        self.assertEqual(Address.to_int('192.168.0.1'), 3232235521)
+        self.assertEqual(Address.to_int('192.168.0.1'), 3232235521)
+        self.assertEqual(Address.to_int(Address('255.255.255.255')), 4294967295)
+
+    @raises(AddressError)
+    def test_address_with_trailing_characters_raises_address_error_exception(self):
+        Address('192.168.0.1*')
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase
+from radar.misc import Address, AddressRange, AddressIndex
+
+
+class TestAddressIndex(TestCase):
+    def setUp(self):
+        self.address_index = AddressIndex([
+            (AddressRange('192.168.0.1 - 192.168.0.100'), 'first'),
+            (AddressRange('192.168.0.50 - 192.168.0.150'), 'second'),
+            (Address('192.168.0.75'), 'third'),
+            (Address('10.0.0.1'), 'first'),
+        ])
+
+    def test_address_index_lookup(self):
+        self.assertEqual(self.address_index.lookup('192.168.0.1'), ['first'])
+        self.assertEqual(self.address_index.lookup('192.168.0.50'), ['first', 'second'])
+        self.assertEqual(self.address_index.lookup('192.168.0.75'), ['first', 'second', 'third'])
+        self.assertEqual(self.address_index.lookup('192.168.0.100'), ['first', 'second'])
+        self.assertEqual(self.address_index.lookup('192.168.0.150'), ['second'])
+        self.assertEqual(self.address_index.lookup('10.0.0.1'), ['first'])
+
+    def test_address_index_lookup_of_address_instance(self):
+        self.assertEqual(self.address_index.lookup(Address('192.168.0.76')), ['first', 'second'])
+
+    def test_address_index_lookup_misses(self):
+        self.assertEqual(self.address_index.lookup('192.168.0.0'), [])
+        self.assertEqual(self.address_index.lookup('192.168.0.151'), [])
+        self.assertEqual(self.address_index.lookup('10.0.0.0'), [])
+        self.assertEqual(self.address_index.lookup('10.0.0.2'), [])
+
+    def test_objects_are_not_repeated(self):
+        address_index = AddressIndex([
+            (AddressRange('192.168.0.1 - 192.168.0.100'), 'first'),
+            (AddressRange('192.168.0.1 - 192.168.0.10'), 'first'),
+        ])
+        self.assertEqual(address_index.lookup('192.168.0.5'), ['first'])
+
+    def test_empty_address_index(self):
+        self.assertEqual(AddressIndex().lookup('192.168.0.1'), [])
@@ -33,6 +33,12 @@ class TestAddressRange(TestCase):
         self.assertEqual(address_range.end_ip.ip, '192.168.0.100')
         self.assertEqual(address_range.end_ip.n, 3232235620)
 
+    def test_address_range_endpoints_are_resolved_with_given_resolve_function(self):
+        addresses = {'first.example.com': '192.168.0.1', 'last.example.com': '192.168.0.100'}
+        address_range = AddressRange('first.example.com - last.example.com', resolve=lambda h: addresses[h])
+        self.assertEqual(address_range.start_ip.ip, '192.168.0.1')
+        self.assertEqual(address_range.end_ip.ip, '192.168.0.100')
+
     def test_addresses_are_included_in_address_range(self):
         address_range = AddressRange('192.168.0.1 - 192.168.0.100')
         [self.assertTrue(Address('192.168.0.' + str(i)) in address_range) for i in range(1, 100 + 1)]
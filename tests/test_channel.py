@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase
+from select import select
+from threading import Thread
+from nose.tools import raises
+from radar.channel import Channel, ChannelClosed
+
+
+class TestChannel(TestCase):
+    def setUp(self):
+        self.channel = Channel(notify=True)
+
+    def _is_readable(self):
+        return select([self.channel], [], [], 0)[0] == [self.channel]
+
+    def test_items_are_read_in_order(self):
+        [self.channel.put(n) for n in range(5)]
+        self.assertEqual([self.channel.get() for _ in range(5)], list(range(5)))
+
+    def test_pending_items_are_read_before_close(self):
+        self.channel.put(1)
+        self.channel.close()
+        self.assertEqual(self.channel.get(), 1)
+        self.assertRaises(ChannelClosed, self.channel.get)
+
+    def test_items_written_after_close_are_discarded(self):
+        self.channel.close()
+        self.channel.put(1)
+        self.assertEqual(self.channel.drain(), [])
+
+    def test_close_wakes_up_every_blocked_reader(self):
+        closed = []
+
+        def read():
+            try:
+                self.channel.get()
+            except ChannelClosed:
+                closed.append(True)
+
+        readers = [Thread(target=read) for _ in range(3)]
+        [r.start() for r in readers]
+        self.channel.close()
+        [r.join(5) for r in readers]
+        self.assertEqual(closed, [True] * 3)
+
+    def test_channel_is_readable_until_drained(self):
+        self.assertFalse(self._is_readable())
+        self.channel.put(1)
+        self.channel.put(2)
+        self.assertTrue(self._is_readable())
+        self.assertEqual(self.channel.drain(), [1, 2])
+        self.assertFalse(self._is_readable())
+
+    def test_close_makes_channel_readable(self):
+        self.channel.close()
+        self.assertTrue(self._is_readable())
+        self.assertTrue(self.channel.is_closed())
+
+    @raises(ChannelClosed)
+    def test_get_nowait_raises_error_if_closed(self):
+        self.channel.close()
+        self.channel.get_nowait()
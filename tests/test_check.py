@@ -20,11 +20,15 @@ Copyright 2015 Lucas Liendo.
 """
 
 
-from unittest import TestCase
-from mock import Mock, MagicMock
+from unittest import TestCase, skipUnless
+from os import name as os_name
+from time import time
+from mock import Mock, MagicMock, patch
+from future.utils import PY2
 from nose.tools import raises
 from json import dumps as serialize_json
-from radar.check import Check, CheckError
+from subprocess import Popen, PIPE
+from radar.check import Check, CheckState, UnixCheck, CheckError, CheckTimeoutError
 
 
 class TestCheck(TestCase):
@@ -98,6 +102,13 @@ class TestCheck(TestCase):
     def test_check_raises_exception_if_invalid_status_beyond_highest_status(self):
         self.dummy_check.update_status({'status': max(Check.STATUS.values()) + 1})
 
+    def test_get_status(self):
+        [self.assertEqual(Check.get_status(v), k) for k, v in Check.STATUS.items()]
+
+    @raises(CheckError)
+    def test_get_status_exception_due_to_invalid_status_type(self):
+        Check.get_status([])
+
     @raises(CheckError)
     def test_get_status_exception_due_to_invalid_status_beyond_lowest_status(self):
         self.dummy_check.get_status(min(Check.STATUS.values()) - 1)
@@ -148,6 +159,22 @@ class TestCheck(TestCase):
         expected_keys = ['id', 'path', 'args']
         self._assert_dictionary_contains_keys(d, expected_keys)
 
+    def test_to_check_dict_contains_timeout(self):
+        d = Check(name='dummy', path='dummy.py', timeout=10).to_check_dict().pop()
+        self.assertEqual(d['timeout'], 10)
+
+    @raises(CheckError)
+    def test_check_raises_exception_if_interval_is_under_one_second(self):
+        Check(name='dummy', path='dummy.py', interval=0.5)
+
+    @raises(CheckError)
+    def test_check_raises_exception_if_invalid_jitter(self):
+        Check(name='dummy', path='dummy.py', interval=10, jitter=-1)
+
+    @raises(CheckError)
+    def test_check_raises_exception_if_invalid_timeout(self):
+        Check(name='dummy', path='dummy.py', timeout='never')
+
     def test_to_check_dict_does_not_contain_args(self):
         d = Check(name='dummy', path='dummy.py').to_check_dict().pop()
         self.assertTrue('args' not in d)
@@ -202,3 +229,72 @@ class TestCheck(TestCase):
         dummy_check.run()
         self.assertEqual(dummy_check.current_status, Check.STATUS['OK'])
         self.assertEqual(dummy_check.previous_status, Check.STATUS['UNKNOWN'])
+
+    def test_run_times_out(self):
+        dummy_check = Check(name='dummy', path='dummy.py', platform_setup=Mock())
+        dummy_check._call_popen = MagicMock(side_effect=CheckTimeoutError())
+        dummy_check.run()
+        self.assertEqual(dummy_check.current_status, Check.STATUS['TIMEOUT'])
+
+    @raises(CheckTimeoutError)
+    def test_communicate_kills_process_after_timeout(self):
+        dummy_check = Check(name='dummy', path='dummy.py', timeout=0.1)
+        dummy_check._communicate(Popen(['sleep', '5'], stdout=PIPE))
+
+    @skipUnless(os_name == 'posix', 'Unix checks only run on Unix')
+    def test_communicate_kills_processes_started_by_check_after_timeout(self):
+        dummy_check = UnixCheck(name='dummy', path='dummy.sh', timeout=0.1)
+        started = time()
+        self.assertRaises(CheckTimeoutError, dummy_check._communicate,
+                          dummy_check._popen(['sh', '-c', 'sleep 5; echo done']))
+        self.assertTrue(time() - started < 5)
+
+    @skipUnless(os_name == 'posix' and not PY2, 'Sessions are started through preexec_fn on Python 2')
+    def test_unix_check_starts_a_new_session_without_preexec_fn(self):
+        with patch('radar.check.Popen') as popen:
+            UnixCheck(name='dummy', path='dummy.sh')._popen(['dummy.sh'])
+
+        self.assertTrue(popen.call_args[1]['start_new_session'])
+        self.assertFalse('preexec_fn' in popen.call_args[1])
+
+
+class TestCheckState(TestCase):
+    def setUp(self):
+        self.check = Check(name='dummy', path='dummy.py', args='-v')
+        self.check_state = self.check.new_state()
+
+    def test_check_state_shares_check_definition(self):
+        self.assertEqual(type(self.check_state), CheckState)
+        self.assertEqual(self.check_state.id, self.check.id)
+        self.assertEqual(self.check_state.name, 'dummy')
+        self.assertEqual(self.check_state.to_check_dict(), self.check.to_check_dict())
+        self.assertEqual(self.check_state, self.check)
+        self.assertEqual(hash(self.check_state), hash(self.check))
+
+    def test_check_state_update_does_not_modify_check(self):
+        self.assertTrue(self.check_state.update_status({'id': self.check.id, 'status': Check.STATUS['OK'], 'details': 'ok'}))
+        self.assertEqual(self.check_state.current_status, Check.STATUS['OK'])
+        self.assertEqual(self.check_state.previous_status, Check.STATUS['UNKNOWN'])
+        self.assertEqual(self.check_state.to_dict()['details'], 'ok')
+        self.assertEqual(self.check.current_status, Check.STATUS['UNKNOWN'])
+        self.assertEqual(self.check.details, '')
+
+    def test_check_state_is_not_updated_if_check_is_disabled(self):
+        self.check.disable()
+        self.assertFalse(self.check_state.update_status({'id': self.check.id, 'status': Check.STATUS['OK']}))
+
+    @raises(AttributeError)
+    def test_check_state_has_no_instance_dict(self):
+        self.check_state.other_attribute = None
+
+    def test_snapshot_is_not_affected_by_later_updates(self):
+        self.check_state.update_status({'id': self.check.id, 'status': Check.STATUS['OK'], 'details': 'ok'})
+        snapshot = self.check_state.snapshot()
+        self.check_state.update_status({'id': self.check.id, 'status': Check.STATUS['SEVERE'], 'details': 'severe'})
+        self.assertEqual(snapshot.current_status, Check.STATUS['OK'])
+        self.assertEqual(snapshot.details, 'ok')
+        self.assertEqual(snapshot.name, self.check.name)
+
+    @raises(AttributeError)
+    def test_snapshot_is_immutable(self):
+        self.check_state.snapshot().current_status = Check.STATUS['OK']
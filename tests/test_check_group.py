@@ -104,3 +104,13 @@ class TestCheckGroup(TestCase):
         check = Check(name='check', path='check.py')
         check_group = CheckGroup(checks=[check])
         check_group.update_status({'id': check.id})
+
+    def test_check_group_state_updates_its_own_check_states(self):
+        check = Check(name='check', path='check.py')
+        check_group = CheckGroup(name='check group', checks=[check])
+        check_group_state = check_group.new_state()
+        self.assertTrue(check_group_state.update_status({'id': check.id, 'status': Check.STATUS['OK']}))
+        self.assertEqual(check_group_state.as_list().pop().current_status, Check.STATUS['OK'])
+        self.assertEqual(check.current_status, Check.STATUS['UNKNOWN'])
+        self.assertEqual(check_group_state.to_dict()['name'], 'check group')
+        self.assertEqual(check_group_state, check_group)
@@ -22,10 +22,12 @@ Copyright 2015 Lucas Liendo.
 
 from unittest import TestCase
 from mock import Mock, ANY
+from queue import Queue
 from nose.tools import raises
 from radar.logger import RadarLogger
-from radar.check import CheckError
-from radar.check_manager import CheckManager
+from radar.check import Check, CheckError
+from radar.channel import Channel
+from radar.check_manager import CheckManager, CheckManagerError
 from radar.protocol import Message
 
 
@@ -36,7 +38,9 @@ class TestCheckManager(TestCase):
             'connect': {
                 'to': ANY,
                 'port': ANY,
-            }
+            },
+            'check workers': 2,
+            'check timeout': 60,
         }
 
         RadarLogger._shared_state['logger'] = Mock()
@@ -55,3 +59,34 @@ class TestCheckManager(TestCase):
     def test_build_checks_raises_check_error(self):
         check_manager = CheckManager(self.platform_setup, Mock(), Mock())
         check_manager._build_checks([{}])
+
+    def test_build_checks_sets_default_timeout(self):
+        check_manager = CheckManager(self.platform_setup, Mock(), Mock())
+        check_manager._Check = Check
+        checks = check_manager._build_checks([{'id': 1, 'path': 'dummy.py'}, {'id': 2, 'path': 'dummy.py', 'timeout': 5}])
+        self.assertEqual([c.timeout for c in checks], [60, 5])
+
+    @raises(CheckManagerError)
+    def test_start_pool_raises_error_due_to_invalid_workers(self):
+        self.platform_setup.config['check workers'] = 0
+        CheckManager(self.platform_setup, Mock(), Mock())._start_pool()
+
+    def test_run_checks_replies_every_check_in_order(self):
+        output_queue = Queue()
+        check_manager = CheckManager(self.platform_setup, Mock(), output_queue)
+        checks = [Mock() for _ in range(5)]
+
+        for n, c in enumerate(checks):
+            c.run.return_value.to_check_reply_dict.return_value = {'id': n}
+
+        check_manager._start_pool()
+        check_manager._run_checks(checks)
+        check_manager._stop_pool()
+        self.assertEqual([r['id'] for r in output_queue.get_nowait()], list(range(5)))
+
+    def test_run_ends_when_input_channel_is_closed(self):
+        input_channel = Channel()
+        input_channel.close()
+        check_manager = CheckManager(self.platform_setup, input_channel, Mock())
+        check_manager.run()
+        self.assertFalse(check_manager.is_stopped())
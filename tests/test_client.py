@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase
+from mock import Mock
+from json import loads as deserialize_json
+from select import select
+from socket import socketpair
+from radar.channel import Channel
+from radar.client import RadarClient
+from radar.protocol import Message
+
+
+class TestRadarClient(TestCase):
+    def setUp(self):
+        self.platform_setup = Mock()
+        self.platform_setup.config = {
+            'connect': {
+                'to': 'localhost',
+                'port': 3333,
+            },
+            'reconnect': False,
+        }
+        self.input_queue = Channel(notify=True)
+        self.client = RadarClient(self.platform_setup, self.input_queue, Channel())
+        self.client.send_message = Mock()
+
+    def _sent_replies(self):
+        sent_payloads = [args[1] for args, _ in self.client.send_message.call_args_list]
+        return [r for payload in sent_payloads for r in deserialize_json(payload)]
+
+    def test_all_pending_replies_are_sent_in_one_message(self):
+        self.input_queue.put_nowait([{'id': 1, 'status': 0}, {'id': 2, 'status': 1}])
+        self.input_queue.put_nowait([{'id': 3, 'status': 2}])
+        self.client.on_timeout()
+        self.assertEqual(self.client.send_message.call_count, 1)
+        self.assertEqual([r['id'] for r in self._sent_replies()], [1, 2, 3])
+        self.assertTrue(self.input_queue.empty())
+
+    def test_nothing_is_sent_if_there_are_no_pending_replies(self):
+        self.client.on_timeout()
+        self.assertFalse(self.client.send_message.called)
+
+    def test_replies_are_split_when_exceeding_max_payload_size(self):
+        replies = [{'id': n, 'status': 0, 'details': 'x' * 1000} for n in range(200)]
+        self.input_queue.put_nowait(replies)
+        self.client.on_timeout()
+        payloads = [args[1] for args, _ in self.client.send_message.call_args_list]
+        self.assertTrue(len(payloads) > 1)
+        [self.assertTrue(len(p) < Message.MAX_PAYLOAD_SIZE) for p in payloads]
+        self.assertEqual([r['id'] for r in self._sent_replies()], list(range(200)))
+
+    def test_client_blocks_until_replies_or_data_arrive(self):
+        self.assertEqual(self.client.network_monitor_timeout, None)
+        self.assertTrue(self.input_queue in self.client._watched_fds())
+
+    def test_replies_are_sent_as_soon_as_they_are_written(self):
+        self.client._watched_fds = lambda: [self.input_queue]
+        self.input_queue.put_nowait([{'id': 1, 'status': 0}])
+        self.assertEqual(self.client._watch(), [])
+        self.assertEqual([r['id'] for r in self._sent_replies()], [1])
+        self.assertEqual(select([self.input_queue], [], [], 0)[0], [])
+
+    def _receive_all(self, peer):
+        received = 0
+
+        while select([peer], [], [], 0)[0]:
+            received += len(peer.recv(65536))
+
+        return received
+
+    def test_replies_the_server_cant_take_yet_are_kept_until_flushed(self):
+        del self.client.send_message
+        self.client.socket, peer = socketpair()
+        self.client.socket.setblocking(0)
+        self.input_queue.put_nowait([{'id': n, 'status': 0, 'details': 'x' * 1000} for n in range(2000)])
+        self.client.on_timeout()
+        self.assertTrue(self.client.has_pending_output())
+        self.assertEqual(self.client._watched_output_fds(), [self.client.socket])
+        self.assertFalse(self.input_queue in self.client._watched_fds())
+        self.input_queue.put_nowait([{'id': 2000, 'status': 0}])
+        self.client.on_timeout()
+        self.assertFalse(self.input_queue.empty())
+        received = self._receive_all(peer)
+
+        while self.client.has_pending_output() or not self.input_queue.empty():
+            self.client.on_timeout()
+            received += self._receive_all(peer)
+
+        self.assertTrue(self.client.is_connected())
+        self.assertTrue(received > 2000 * 1000)
+        self.client.socket.close()
+        peer.close()
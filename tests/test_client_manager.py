@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase
+from mock import Mock, MagicMock
+from radar.misc import Address, AddressRange
+from radar.check import Check
+from radar.monitor import Monitor
+from radar.client_manager import ClientManager
+from radar.dispatch_filter import DispatchFilter
+from radar.network.client import Client
+from radar.protocol import Message
+
+
+class DummyClient(Client):
+    def on_receive(self):
+        pass
+
+    def send_packed_message(self, packed_message):
+        pass
+
+
+class TestClientManager(TestCase):
+    def setUp(self):
+        self.check = Check(name='Load average', path='load_average')
+        self.first_monitor = Monitor(addresses=[AddressRange('192.168.0.1 - 192.168.0.100')], checks=[self.check])
+        self.second_monitor = Monitor(addresses=[Address('192.168.0.200')], checks=[self.check])
+        self.client_manager = ClientManager(Mock(monitors=[self.first_monitor, self.second_monitor], resolver=None,
+                                                 dispatch_filter=None))
+        self.dummy_client = DummyClient(address='192.168.0.1', port=10000)
+
+    def test_client_is_only_registered_in_its_monitors(self):
+        self.assertTrue(self.client_manager.matches_any_monitor(self.dummy_client))
+        self.client_manager.register(self.dummy_client)
+        self.assertTrue(self.dummy_client in self.first_monitor.active_clients)
+        self.assertFalse(self.dummy_client in self.second_monitor.active_clients)
+        self.assertFalse(self.client_manager.matches_any_monitor(self.dummy_client))
+
+    def test_registered_client_addresses_are_only_looked_up_in_the_index(self):
+        self.first_monitor.matches = MagicMock(wraps=self.first_monitor.matches)
+        self.client_manager.register(self.dummy_client)
+        self.first_monitor.matches.assert_called_with(self.dummy_client, address_matched=True)
+
+    def test_unknown_client_does_not_match_any_monitor(self):
+        self.assertFalse(self.client_manager.matches_any_monitor(DummyClient(address='10.0.0.1', port=10000)))
+
+    def test_replies_are_only_routed_to_client_monitors(self):
+        self.client_manager.register(self.dummy_client)
+        self.second_monitor.update_checks = MagicMock(return_value={})
+        reply = [{'id': self.check.id, 'status': Check.STATUS['OK']}]
+        updated_checks = self.client_manager.process_message(self.dummy_client, Message.TYPE['CHECK REPLY'], reply)
+        self.assertEqual(len(updated_checks), 1)
+        self.assertFalse(self.second_monitor.update_checks.called)
+
+    def test_unregistered_client_is_removed_from_its_monitors(self):
+        self.client_manager.register(self.dummy_client)
+        self.client_manager.unregister(self.dummy_client)
+        self.assertFalse(self.dummy_client in self.first_monitor.active_clients)
+        reply = [{'id': self.check.id, 'status': Check.STATUS['OK']}]
+        self.assertEqual(self.client_manager.process_message(self.dummy_client, Message.TYPE['CHECK REPLY'], reply), [])
+
+    def test_only_monitors_with_clients_are_polled(self):
+        self.client_manager.register(self.dummy_client)
+        self.first_monitor.poll = MagicMock()
+        self.second_monitor.poll = MagicMock()
+        self.client_manager.poll()
+        self.assertTrue(self.first_monitor.poll.called)
+        self.assertFalse(self.second_monitor.poll.called)
+
+    def test_dispatch_filter_drops_unchanged_checks(self):
+        client_manager = ClientManager(Mock(monitors=[self.first_monitor], resolver=None,
+                                            dispatch_filter=DispatchFilter(heartbeat=0)))
+        client_manager.register(self.dummy_client)
+        reply = [{'id': self.check.id, 'status': Check.STATUS['OK']}]
+        self.assertEqual(len(client_manager.process_message(self.dummy_client, Message.TYPE['CHECK REPLY'], reply)), 1)
+        self.assertEqual(client_manager.process_message(self.dummy_client, Message.TYPE['CHECK REPLY'], reply), [])
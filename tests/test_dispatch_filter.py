@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase
+from mock import patch
+from nose.tools import raises
+from radar.misc import Address
+from radar.check import Check, CheckGroup
+from radar.contact import Contact
+from radar.monitor import Monitor
+from radar.network.client import Client
+from radar.dispatch_filter import DispatchFilter, DispatchFilterError
+
+
+class DummyClient(Client):
+    def on_receive(self):
+        pass
+
+
+class TestDispatchFilter(TestCase):
+    def setUp(self):
+        self.load = Check(name='Load average', path='load_average')
+        self.disk = Check(name='Disk usage', path='disk_usage')
+        self.monitor = Monitor(addresses=[Address('192.168.0.1')], checks=[self.load, self.disk],
+                               contacts=[Contact(name='Lucas', email='lucas@radar.org')])
+        self.client = DummyClient(address='192.168.0.1', port=10000)
+        self.monitor.add_client(self.client)
+        self.dispatch_filter = DispatchFilter(tolerance=0.1, heartbeat=0)
+
+    def _reply(self, check, status, details='', data=None):
+        return {'id': check.id, 'status': Check.STATUS[status], 'details': details, 'data': data}
+
+    def _dispatch(self, statuses):
+        updated = self.monitor.update_checks(self.client, statuses)
+        return set([c.name for c in self.dispatch_filter.filter(self.client, self.monitor, updated).get('checks', [])])
+
+    def test_checks_are_dispatched_the_first_time(self):
+        self.assertEqual(self._dispatch([self._reply(self.load, 'OK'), self._reply(self.disk, 'OK')]),
+                         set(['Load average', 'Disk usage']))
+
+    def test_unchanged_checks_are_not_dispatched(self):
+        self._dispatch([self._reply(self.load, 'OK'), self._reply(self.disk, 'OK')])
+        self.assertEqual(self._dispatch([self._reply(self.load, 'OK'), self._reply(self.disk, 'OK')]), set())
+
+    def test_status_changes_are_dispatched(self):
+        self._dispatch([self._reply(self.load, 'OK'), self._reply(self.disk, 'OK')])
+        self.assertEqual(self._dispatch([self._reply(self.load, 'OK'), self._reply(self.disk, 'SEVERE')]),
+                         set(['Disk usage']))
+
+    def test_details_changes_are_dispatched(self):
+        self._dispatch([self._reply(self.load, 'OK', details='Load is low.')])
+        self.assertEqual(self._dispatch([self._reply(self.load, 'OK', details='Load is rising.')]),
+                         set(['Load average']))
+
+    def test_data_changes_within_tolerance_are_not_dispatched(self):
+        self._dispatch([self._reply(self.load, 'OK', data={'load': [1.0, 0.5]})])
+        self.assertEqual(self._dispatch([self._reply(self.load, 'OK', data={'load': [1.05, 0.5]})]), set())
+        self.assertEqual(self._dispatch([self._reply(self.load, 'OK', data={'load': [1.05, 0.6]})]),
+                         set(['Load average']))
+
+    # Values are compared against the last dispatched ones, so slow drifts
+    # are eventually dispatched too.
+    def test_data_drift_beyond_tolerance_is_dispatched(self):
+        self._dispatch([self._reply(self.load, 'OK', data=100)])
+        self.assertEqual(self._dispatch([self._reply(self.load, 'OK', data=106)]), set())
+        self.assertEqual(self._dispatch([self._reply(self.load, 'OK', data=111)]), set(['Load average']))
+
+    def test_heartbeat_dispatches_every_check(self):
+        self.dispatch_filter = DispatchFilter(heartbeat=60)
+
+        with patch('radar.dispatch_filter.time', return_value=1000):
+            self._dispatch([self._reply(self.load, 'OK')])
+
+        with patch('radar.dispatch_filter.time', return_value=1030):
+            self.assertEqual(self._dispatch([self._reply(self.load, 'OK')]), set())
+
+        with patch('radar.dispatch_filter.time', return_value=1061):
+            self.assertEqual(self._dispatch([self._reply(self.load, 'OK')]), set(['Load average', 'Disk usage']))
+
+    def test_check_groups_are_split_into_their_checks(self):
+        cpu = Check(name='CPU usage', path='cpu_usage')
+        monitor = Monitor(addresses=[Address('192.168.0.1')], checks=[CheckGroup(name='Load', checks=[self.load, cpu])])
+        client = DummyClient(address='192.168.0.1', port=10001)
+        monitor.add_client(client)
+        self.dispatch_filter.filter(client, monitor, monitor.update_checks(client, [self._reply(self.load, 'OK')]))
+        updated = monitor.update_checks(client, [self._reply(self.load, 'OK'), self._reply(cpu, 'SEVERE')])
+        self.assertEqual([c.name for c in self.dispatch_filter.filter(client, monitor, updated)['checks']], ['CPU usage'])
+
+    def test_checks_are_remembered_per_monitor(self):
+        load = Check(name='Load average', path='load_average')
+        monitor = Monitor(addresses=[Address('192.168.0.1')], checks=[load])
+        monitor.add_client(self.client)
+        self._dispatch([self._reply(self.load, 'OK')])
+        updated = monitor.update_checks(self.client, [self._reply(load, 'OK')])
+        self.assertEqual([c.name for c in self.dispatch_filter.filter(self.client, monitor, updated)['checks']],
+                         ['Load average'])
+        self.assertEqual(self._dispatch([self._reply(self.load, 'OK')]), set())
+
+    def test_checks_are_remembered_when_monitor_addresses_change(self):
+        self._dispatch([self._reply(self.load, 'OK')])
+        self.monitor.addresses = set([Address('192.168.0.1'), Address('192.168.0.2')])
+        self.assertEqual(self._dispatch([self._reply(self.load, 'OK')]), set())
+
+    def test_forgotten_clients_are_dispatched_again(self):
+        self._dispatch([self._reply(self.load, 'OK')])
+        self.dispatch_filter.forget(self.client)
+        self.assertEqual(self._dispatch([self._reply(self.load, 'OK')]), set(['Load average']))
+
+    @raises(DispatchFilterError)
+    def test_invalid_tolerance_raises_error(self):
+        DispatchFilter(tolerance=-1)
+
+    @raises(DispatchFilterError)
+    def test_invalid_heartbeat_raises_error(self):
+        DispatchFilter(heartbeat='often')
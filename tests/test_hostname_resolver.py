@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase
+from nose.tools import raises
+from mock import patch
+from radar.misc import Address
+from radar.resolver import HostnameResolver, HostnameResolverError
+
+
+class StubResolver(object):
+    def __init__(self, addresses):
+        self.addresses = addresses
+        self.resolved = []
+
+    def __call__(self, hostname):
+        self.resolved.append(hostname)
+        return self.addresses[hostname]
+
+
+class TestHostnameResolver(TestCase):
+    def setUp(self):
+        self.stub_resolver = StubResolver({'first': '10.0.0.1', 'second': '10.0.0.2'})
+        self.resolver = HostnameResolver(workers=2, ttl=60, resolve=self.stub_resolver)
+
+    def test_hostnames_are_resolved(self):
+        self.assertEqual(self.resolver.resolve(['first', 'second', 'first']), set(['first', 'second']))
+        self.assertEqual(self.resolver.lookup('first'), '10.0.0.1')
+        self.assertEqual(self.resolver.lookup('second'), '10.0.0.2')
+        self.assertEqual(sorted(self.stub_resolver.resolved), ['first', 'second'])
+
+    def test_resolved_hostnames_are_cached(self):
+        self.resolver.resolve(['first'])
+        self.resolver.resolve(['first'])
+        self.resolver.lookup('first')
+        self.assertEqual(self.stub_resolver.resolved, ['first'])
+
+    def test_lookup_resolves_unknown_hostnames(self):
+        self.assertEqual(self.resolver.lookup('second'), '10.0.0.2')
+
+    @raises(HostnameResolverError)
+    def test_lookup_raises_error_on_unresolvable_hostname(self):
+        self.resolver.lookup('unknown')
+
+    @raises(HostnameResolverError)
+    def test_resolver_raises_error_on_invalid_ttl(self):
+        HostnameResolver(ttl=0)
+
+    def test_refresh_only_resolves_expired_hostnames(self):
+        with patch('radar.resolver.time', return_value=0):
+            self.resolver.resolve(['first'])
+
+        with patch('radar.resolver.time', return_value=30):
+            self.resolver.resolve(['second'])
+
+        self.stub_resolver.addresses['first'] = '10.0.0.3'
+
+        with patch('radar.resolver.time', return_value=60):
+            self.assertEqual(self.resolver.refresh(), set(['first']))
+
+        self.assertEqual(self.resolver.lookup('first'), '10.0.0.3')
+        self.assertEqual(self.stub_resolver.resolved.count('second'), 1)
+
+    def test_unchanged_hostnames_are_not_reported(self):
+        with patch('radar.resolver.time', return_value=0):
+            self.resolver.resolve(['first'])
+
+        with patch('radar.resolver.time', return_value=60):
+            self.assertEqual(self.resolver.refresh(), set())
+
+    def test_last_known_address_is_kept_if_refresh_fails(self):
+        with patch('radar.resolver.time', return_value=0):
+            self.resolver.resolve(['first'])
+
+        del self.stub_resolver.addresses['first']
+
+        with patch('radar.resolver.time', return_value=60):
+            self.assertEqual(self.resolver.refresh(), set())
+
+        self.assertEqual(self.resolver.lookup('first'), '10.0.0.1')
+
+    def test_address_uses_given_resolver(self):
+        address = Address('first', resolve=self.resolver.lookup)
+        self.assertEqual(address.ip, '10.0.0.1')
+        self.assertEqual(address.hostname, 'first')
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase
+from logging import getLogger, makeLogRecord, Handler, INFO
+from threading import Event
+from mock import Mock
+from nose.tools import raises
+from radar.logger import RadarLogger, AsyncHandler, LoggerError
+
+
+class TestRadarLogger(TestCase):
+    def setUp(self):
+        self.logger = getLogger('radar-test')
+        self.logger.setLevel(INFO)
+        self.logger.info = Mock()
+        self.logger.debug = Mock()
+        RadarLogger._shared_state['logger'] = self.logger
+
+    def tearDown(self):
+        RadarLogger._shared_state['logger'] = None
+
+    def test_message_is_formatted_with_arguments(self):
+        RadarLogger.log('{:} - {:}', 'a', 1)
+        self.logger.info.assert_called_once_with('a - 1')
+
+    def test_disabled_level_is_not_formatted(self):
+        message = Mock()
+        RadarLogger.debug(message, 'a')
+        self.assertFalse(message.format.called)
+        self.assertFalse(self.logger.debug.called)
+        self.assertFalse(RadarLogger.is_enabled_for('debug'))
+
+    def test_enabled_level_is_logged(self):
+        self.logger.setLevel(RadarLogger.LEVELS['DEBUG'])
+        RadarLogger.debug('{:}', 'a')
+        self.logger.debug.assert_called_once_with('a')
+        self.assertTrue(RadarLogger.is_enabled_for('debug'))
+
+    def test_logging_is_disabled_without_logger(self):
+        RadarLogger._shared_state['logger'] = None
+        self.assertFalse(RadarLogger.is_enabled_for('debug'))
+
+    @raises(LoggerError)
+    def test_invalid_level_raises_error(self):
+        RadarLogger._validate_level('verbose')
+
+
+class SlowHandler(Handler):
+    def __init__(self):
+        Handler.__init__(self)
+        self.written = Event()
+        self.unblock = Event()
+        self.messages = []
+
+    def emit(self, record):
+        self.written.set()
+        self.unblock.wait(5)
+        self.messages.append(record.getMessage())
+
+
+class TestAsyncHandler(TestCase):
+    def setUp(self):
+        self.handler = SlowHandler()
+
+    def _record(self, message):
+        return makeLogRecord({'msg': message, 'levelno': INFO, 'levelname': 'INFO'})
+
+    def test_records_are_written_in_order(self):
+        self.handler.unblock.set()
+        async_handler = AsyncHandler(self.handler)
+        [async_handler.handle(self._record(str(i))) for i in range(10)]
+        async_handler.close()
+        self.assertEqual(self.handler.messages, [str(i) for i in range(10)])
+
+    def test_records_are_dropped_if_queue_is_full(self):
+        async_handler = AsyncHandler(self.handler, queue_size=1, queue_policy='drop')
+        async_handler.handle(self._record('first'))
+        self.handler.written.wait(5)
+        [async_handler.handle(self._record(m)) for m in ['second', 'third', 'fourth']]
+        self.handler.unblock.set()
+        async_handler.close()
+        self.assertEqual(self.handler.messages[:2], ['first', 'Error - 2 log messages were dropped (log queue was full).'])
+        self.assertEqual(self.handler.messages[2:], ['second'])
+
+    @raises(LoggerError)
+    def test_invalid_queue_policy_raises_error(self):
+        AsyncHandler(self.handler, queue_policy='wait')
+
+    @raises(LoggerError)
+    def test_invalid_queue_size_raises_error(self):
+        AsyncHandler(self.handler, queue_size=0)
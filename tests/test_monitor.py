@@ -28,6 +28,8 @@ from radar.contact import Contact, ContactGroup
 from radar.monitor import Monitor, MonitorError
 from radar.network.client import Client
 from radar.protocol import Message
+from radar.scheduler import PollScheduler
+from mock import MagicMock, patch
 
 
 class DummyClient(Client):
@@ -37,6 +39,9 @@ class DummyClient(Client):
     def send_message(self, message_type, message, message_options=Message.OPTIONS['NONE']):
         pass
 
+    def send_packed_message(self, packed_message):
+        pass
+
 
 class TestMonitor(TestCase):
     def setUp(self):
@@ -88,6 +93,12 @@ class TestMonitor(TestCase):
     def test_add_client_fails(self):
         self.assertFalse(self.monitor.add_client(DummyClient(address='192.168.0.101', port=10000)))
 
+    def test_add_address_matched_client_does_not_scan_addresses(self):
+        self.monitor.addresses = set([MagicMock(__contains__=MagicMock(return_value=True))])
+        self.assertTrue(self.monitor.add_client(self.dummy_client, address_matched=True))
+        self.assertFalse(list(self.monitor.addresses)[0].__contains__.called)
+        self.assertFalse(self.monitor.add_client(self.dummy_client, address_matched=True))
+
     def test_remove_client_succeeds(self):
         self.monitor.add_client(self.dummy_client)
         self.assertEqual(len(self.monitor.active_clients), 1)
@@ -118,14 +129,37 @@ class TestMonitor(TestCase):
         check_status = {'status': Check.STATUS['ERROR'], 'id': self.checks[0].id}
         self.monitor.add_client(self.dummy_client)
         updated_checks = self.monitor.update_checks(self.dummy_client, [check_status])
-        self.assertEqual(list(self.monitor.active_clients[0]['checks']).pop().current_status, Check.STATUS['ERROR'])
+        self.assertEqual(list(self.monitor.active_clients[self.dummy_client]['checks']).pop().current_status, Check.STATUS['ERROR'])
         self.assertNotEqual(updated_checks, {})
 
+    def test_monitor_clients_have_their_own_check_states(self):
+        other_client = DummyClient(address='192.168.0.2', port=10000)
+        [self.monitor.add_client(c) for c in [self.dummy_client, other_client]]
+        self.monitor.update_checks(self.dummy_client, [{'status': Check.STATUS['ERROR'], 'id': self.checks[0].id}])
+        first_check, second_check = [list(self.monitor.active_clients[c]['checks']).pop() for c in [self.dummy_client, other_client]]
+        self.assertEqual(first_check.current_status, Check.STATUS['ERROR'])
+        self.assertEqual(second_check.current_status, Check.STATUS['UNKNOWN'])
+        self.assertIs(first_check.check, second_check.check)
+        self.assertIs(self.monitor.active_clients[self.dummy_client]['contacts'], self.monitor.active_clients[other_client]['contacts'])
+
+    def test_monitor_updates_check_group_status(self):
+        check = Check(name='Uptime', path='uptime')
+        check_group = CheckGroup(name='check group', checks=[check])
+        monitor = Monitor(addresses=[Address('192.168.0.1')], checks=[check_group])
+        monitor.add_client(self.dummy_client)
+        updated_checks = monitor.update_checks(self.dummy_client, [{'status': Check.STATUS['OK'], 'id': check.id}])
+        self.assertEqual(updated_checks['checks'], set([check_group]))
+        self.assertEqual(list(updated_checks['checks']).pop().as_list().pop().current_status, Check.STATUS['OK'])
+
+    def test_monitor_does_not_update_checks_of_unknown_client(self):
+        check_status = {'status': Check.STATUS['ERROR'], 'id': self.checks[0].id}
+        self.assertEqual(self.monitor.update_checks(self.dummy_client, [check_status]), {})
+
     def test_monitor_does_not_update_check_status(self):
         check_status = {'status': Check.STATUS['ERROR'], 'id': self.checks[0].id + 1}
         self.monitor.add_client(self.dummy_client)
         updated_checks = self.monitor.update_checks(self.dummy_client, [check_status])
-        self.assertEqual(list(self.monitor.active_clients[0]['checks']).pop().current_status, Check.STATUS['UNKNOWN'])
+        self.assertEqual(list(self.monitor.active_clients[self.dummy_client]['checks']).pop().current_status, Check.STATUS['UNKNOWN'])
         self.assertEqual(updated_checks, {})
 
     def test_monitor_to_dict(self):
@@ -139,3 +173,59 @@ class TestMonitor(TestCase):
         message = self.monitor.poll(Message.TYPE['CHECK'])
         [self.assertTrue(('path' in c) and ('id' in c)) for c in message]
         self.assertEqual(type(message), list)
+
+    def test_monitor_polls_only_given_checks(self):
+        other_check = Check(name='Uptime', path='uptime')
+        monitor = Monitor(addresses=[AddressRange('192.168.0.1 - 192.168.0.100')], checks=self.checks + [other_check])
+        monitor.add_client(self.dummy_client)
+        message = monitor.poll(Message.TYPE['CHECK'], checks=[other_check])
+        self.assertEqual([c['id'] for c in message], [other_check.id])
+
+    def test_monitor_does_not_poll_checks_from_other_monitors(self):
+        self.monitor.add_client(self.dummy_client)
+        message = self.monitor.poll(Message.TYPE['CHECK'], checks=[Check(name='Uptime', path='uptime')])
+        self.assertEqual(message, [])
+
+    def test_monitor_only_polls_clients_in_slot(self):
+        self.dummy_client.send_packed_message = MagicMock()
+        self.monitor.add_client(self.dummy_client)
+        slot = PollScheduler.get_slot(self.dummy_client.address, 4)
+        self.monitor.poll(Message.TYPE['CHECK'], slot=(slot + 1) % 4, slots=4)
+        self.assertFalse(self.dummy_client.send_packed_message.called)
+        self.monitor.poll(Message.TYPE['CHECK'], slot=slot, slots=4)
+        self.assertTrue(self.dummy_client.send_packed_message.called)
+
+    def test_monitor_assigns_client_slots_once(self):
+        other_client = DummyClient(address='192.168.0.2', port=10000)
+        [setattr(c, 'send_packed_message', MagicMock()) for c in [self.dummy_client, other_client]]
+        self.monitor.add_client(self.dummy_client)
+
+        with patch('radar.monitor.PollScheduler.get_slot', wraps=PollScheduler.get_slot) as get_slot:
+            [self.monitor.poll(Message.TYPE['CHECK'], slot=s, slots=4) for s in range(4)]
+            self.monitor.add_client(other_client)
+            [self.monitor.poll(Message.TYPE['CHECK'], slot=s, slots=4) for s in range(4)]
+            self.assertEqual(get_slot.call_count, 2)
+
+        self.assertEqual(self.dummy_client.send_packed_message.call_count, 2)
+        self.assertEqual(other_client.send_packed_message.call_count, 1)
+        self.monitor.remove_client(other_client)
+        [self.monitor.poll(Message.TYPE['CHECK'], slot=s, slots=4) for s in range(4)]
+        self.assertEqual(other_client.send_packed_message.call_count, 1)
+
+    def test_monitor_sends_the_same_packed_message_to_all_clients(self):
+        other_client = DummyClient(address='192.168.0.2', port=10000)
+        [setattr(c, 'send_packed_message', MagicMock()) for c in [self.dummy_client, other_client]]
+        [self.monitor.add_client(c) for c in [self.dummy_client, other_client]]
+        self.monitor.poll(Message.TYPE['CHECK'])
+        packed_message = self.dummy_client.send_packed_message.call_args[0][0]
+        self.assertIs(other_client.send_packed_message.call_args[0][0], packed_message)
+        self.monitor.poll(Message.TYPE['CHECK'])
+        self.assertIs(self.dummy_client.send_packed_message.call_args[0][0], packed_message)
+
+    def test_monitor_rebuilds_poll_message_when_a_check_is_disabled(self):
+        self.monitor.add_client(self.dummy_client)
+        self.assertEqual(len(self.monitor.poll(Message.TYPE['CHECK'])), 1)
+        self.checks[0].disable()
+        self.assertEqual(self.monitor.poll(Message.TYPE['CHECK']), [])
+        self.checks[0].enable()
+        self.assertEqual(len(self.monitor.poll(Message.TYPE['CHECK'])), 1)
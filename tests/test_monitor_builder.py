@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+
+from unittest import TestCase
+from mock import Mock, patch
+from yaml import safe_load
+from radar.check import Check
+from radar.config.server import MonitorBuilder
+
+
+class TestMonitorBuilder(TestCase):
+    def setUp(self):
+        self.input_yaml = """
+        - monitor:
+            hosts: [web-01.example.com, 10.0.0.1, 10.0.0.1 - 10.0.0.10]
+            watch: [Load average]
+            notify: []
+        """
+        self.resolver = Mock(lookup=Mock(return_value='192.168.0.1'))
+
+    def _build_monitor_builder(self):
+        with patch.object(MonitorBuilder, '_read_config', return_value=safe_load(self.input_yaml)):
+            return MonitorBuilder(None)
+
+    def test_hyphenated_hostnames_are_gathered(self):
+        self.assertEqual(self._build_monitor_builder().get_hostnames(), ['web-01.example.com'])
+
+    def test_hostnames_are_only_resolved_through_the_resolver(self):
+        with patch('radar.misc.gethostbyname') as gethostbyname:
+            monitor = self._build_monitor_builder().build([Check(name='Load average', path='load_average')], [],
+                                                          resolver=self.resolver).pop()
+
+        self.assertFalse(gethostbyname.called)
+        self.resolver.lookup.assert_called_once_with('web-01.example.com')
+        self.assertEqual(len(monitor.addresses), 3)
+        self.assertTrue(any(['192.168.0.1' in a for a in monitor.addresses]))
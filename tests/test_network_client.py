@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase
+from errno import EAGAIN
+from socket import error as SocketError
+from nose.tools import raises
+from mock import MagicMock
+from radar.network.client import Client, ClientSendError, ClientAbortError
+
+
+class DummyClient(Client):
+    def on_receive(self):
+        pass
+
+
+class TestClientOutput(TestCase):
+    def setUp(self):
+        self.socket = MagicMock()
+        self.output_listener = MagicMock()
+        self.client = DummyClient('localhost', 3333, socket=self.socket, blocking_socket=False)
+        self.client.set_output_listener(self.output_listener, output_limit=10)
+
+    def _would_block(self, data):
+        raise SocketError(EAGAIN, 'Resource temporarily unavailable')
+
+    def test_write_sends_right_away_if_nothing_is_buffered(self):
+        self.socket.send = MagicMock(side_effect=lambda data: len(data))
+        self.assertEqual(self.client.write(b'abc'), 3)
+        self.assertFalse(self.client.has_pending_output())
+        self.assertFalse(self.output_listener.called)
+
+    def test_write_buffers_what_can_not_be_sent(self):
+        self.socket.send = MagicMock(side_effect=[1, SocketError(EAGAIN, 'Resource temporarily unavailable')])
+        self.client.write(b'abc')
+        self.assertTrue(self.client.has_pending_output())
+        self.output_listener.assert_called_once_with(self.client)
+        self.socket.send = MagicMock(side_effect=lambda data: len(data))
+        self.assertTrue(self.client.flush())
+        self.socket.send.assert_called_once_with(b'bc')
+
+    def test_write_does_not_send_if_output_is_buffered(self):
+        self.socket.send = MagicMock(side_effect=self._would_block)
+        self.client.write(b'abc')
+        self.client.write(b'def')
+        self.assertEqual(self.socket.send.call_count, 1)
+        self.assertFalse(self.client.flush())
+        self.socket.send = MagicMock(side_effect=lambda data: len(data))
+        self.assertTrue(self.client.flush())
+        self.assertEqual([c[0][0] for c in self.socket.send.call_args_list], [b'abc', b'def'])
+
+    @raises(ClientSendError)
+    def test_write_drops_data_beyond_output_limit(self):
+        self.socket.send = MagicMock(side_effect=self._would_block)
+        self.client.write(b'0123456789')
+
+        try:
+            self.client.write(b'a')
+        finally:
+            self.assertTrue(self.client.output_overflowed)
+
+    def test_output_overflow_is_cleared_once_flushed(self):
+        self.socket.send = MagicMock(side_effect=self._would_block)
+        self.client.write(b'0123456789')
+        self.assertRaises(ClientSendError, self.client.write, b'a')
+        self.socket.send = MagicMock(side_effect=lambda data: len(data))
+        self.assertTrue(self.client.flush())
+        self.assertFalse(self.client.output_overflowed)
+
+    @raises(ClientSendError)
+    def test_flush_raises_error_on_socket_error(self):
+        self.socket.send = MagicMock(side_effect=self._would_block)
+        self.client.write(b'abc')
+        self.socket.send = MagicMock(side_effect=SocketError(104, 'Connection reset by peer'))
+        self.client.flush()
+
+    def test_client_is_aborted_on_abort_errors(self):
+        self.client.on_receive = MagicMock(side_effect=ClientAbortError())
+        self.client._process_message()
+        self.assertFalse(self.client.is_connected())
+        self.assertTrue(self.socket.close.called)
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase, skipUnless
+from socket import socket, create_connection, error as SocketError
+from errno import EMFILE
+from select import select
+from time import time
+from mock import Mock, patch
+from radar.logger import RadarLogger
+from radar.client import RadarClientLite
+from radar.network.server import Server
+from radar.network.monitor.select_monitor import SelectMonitor
+from radar.network.monitor.poll_monitor import PollMonitor
+from radar.network.monitor.epoll_monitor import EPollMonitor
+from radar.network.monitor import NetworkMonitorError
+from radar.protocol import Message, MessageNotReady
+
+
+class DummyServer(Server):
+
+    Client = RadarClientLite
+
+    def __init__(self, *args, **kwargs):
+        self.messages = []
+        Server.__init__(self, 'localhost', 0, *args, **kwargs)
+
+    def on_receive(self, client):
+        try:
+            self.messages += [(message_type, message.tobytes()) for message_type, message in client.receive_messages()]
+        except MessageNotReady:
+            pass
+
+        return not client.would_block()
+
+
+class TestServer(TestCase):
+    def setUp(self):
+        RadarLogger._shared_state['logger'] = Mock()
+        self.servers = []
+        self.peers = []
+
+    def tearDown(self):
+        [p.close() for p in self.peers]
+        [s.on_shutdown() for s in self.servers]
+
+    def _build_server(self, **kwargs):
+        kwargs.setdefault('network_monitor_timeout', 1)
+        server = DummyServer(blocking_socket=False, **kwargs)
+        self.servers.append(server)
+        return server
+
+    def _connect(self, server, peers=1):
+        self.peers += [create_connection(server.socket.getsockname()) for _ in range(peers)]
+        select([server.socket], [], [], 1)
+
+    def test_accept_limit_caps_connections_accepted_at_once(self):
+        server = self._build_server(accept_limit=2)
+        self._connect(server, peers=3)
+        server._accept_clients()
+        self.assertEqual(len(server._clients), 2)
+        server._accept_clients()
+        self.assertEqual(len(server._clients), 3)
+
+    def test_accept_errors_are_logged_and_stop_accepting(self):
+        server = self._build_server(accept_limit=10)
+        self._connect(server, peers=2)
+        accept = Mock(side_effect=SocketError(EMFILE, 'Too many open files'))
+
+        with patch.object(server, 'socket', Mock(accept=accept)):
+            server._accept_clients()
+
+        self.assertEqual(accept.call_count, 1)
+        self.assertEqual(str(RadarLogger._shared_state['logger'].info.call_args[0][0]),
+                         'Error - Couldn\'t accept new client. Details : Too many open files.')
+
+    def test_accept_stops_when_backlog_is_empty(self):
+        server = self._build_server(accept_limit=10)
+        self._connect(server)
+        server._accept_clients()
+        self.assertEqual(len(server._clients), 1)
+
+    @skipUnless(hasattr(__import__('select'), 'epoll'), 'epoll is not available')
+    def test_edge_triggered_server_drains_messages_larger_than_its_buffer(self):
+        server = self._build_server(network_monitor=Mock(), edge_triggered=True)
+        server.network_monitor = EPollMonitor(server, 1, edge_triggered=True)
+        self._connect(server)
+        server.network_monitor.watch()
+        payload = b'x' * 20000
+        self.peers[0].sendall(Message.pack(Message.TYPE['CHECK REPLY'], payload))
+        server.network_monitor.watch()
+        self.assertEqual(server.messages, [(Message.TYPE['CHECK REPLY'], payload)])
+
+    def test_network_monitor_keeps_edge_triggered_setting(self):
+        server = self._build_server(network_monitor=Mock())
+        self.assertTrue(EPollMonitor(server, 1, edge_triggered=True)._edge_triggered)
+
+    def _available_monitors(self, server):
+        monitors = []
+
+        for NetworkMonitor in [SelectMonitor, PollMonitor, EPollMonitor]:
+            try:
+                monitors.append(NetworkMonitor(server, 5))
+            except NetworkMonitorError:
+                pass
+
+        return monitors
+
+    def test_buffered_output_wakes_up_the_server(self):
+        server = self._build_server(network_monitor=Mock())
+        self._connect(server)
+        server._accept_clients()
+        client = list(server._clients.values())[0]
+        server._watch_output = Mock()
+
+        for network_monitor in self._available_monitors(server):
+            server.network_monitor = network_monitor
+            server._on_output(client)
+            started = time()
+            network_monitor.watch()
+            self.assertTrue(time() - started < 5)
+            server._watch_output.assert_called_with(client)
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase
+from os import getpid, _exit
+from socket import socketpair
+from itertools import count
+from threading import Event
+from mock import Mock, patch
+from nose.tools import raises
+from radar.logger import RadarLogger
+from radar.check import Check
+from radar.contact import Contact
+from radar.plugin import ServerPlugin, ServerPluginError, PluginWorker, PluginManager, PluginProcess, CheckReply, ReplyEvent
+from radar.protocol import Message
+
+
+class RecordingPlugin(ServerPlugin):
+
+    PLUGIN_NAME = 'Recording plugin'
+
+    def on_start(self):
+        self.replies = []
+        self.received = Event()
+        self.unblock = Event()
+        self.unblock.set()
+
+    def on_check_reply(self, address, port, checks, contacts):
+        self.unblock.wait(5)
+        self.replies.append(checks)
+        self.received.set()
+
+
+class BatchPlugin(RecordingPlugin):
+
+    PLUGIN_NAME = 'Batch plugin'
+
+    def on_start(self):
+        super(BatchPlugin, self).on_start()
+        self.batches = []
+        self.tests = []
+
+    def on_check_replies(self, replies):
+        self.batches.append(replies)
+        self.received.set()
+
+    def on_test_reply(self, address, port, checks, contacts):
+        self.tests.append(checks)
+
+
+class ProcessPlugin(ServerPlugin):
+
+    PLUGIN_NAME = 'Process plugin'
+    PLUGIN_PROCESS = True
+
+    def on_start(self):
+        self.log('Started.')
+
+    # Port 0 makes the plugin process die.
+    def on_check_reply(self, address, port, checks, contacts):
+        if port == 0:
+            _exit(1)
+
+        self.log('{:} {:}'.format(port, getpid()))
+
+
+class FailingPlugin(RecordingPlugin):
+
+    PLUGIN_NAME = 'Failing plugin'
+
+    def on_check_reply(self, address, port, checks, contacts):
+        raise Exception('Failing plugin')
+
+
+class TestPluginManager(TestCase):
+    def setUp(self):
+        RadarLogger._shared_state['logger'] = Mock()
+        self.check = Check(id=1, name='load average', path='load-average.py')
+        self.contact = Contact(id=2, name='Lucas', email='lucas@radar.org')
+
+    def _build_plugin(self, Plugin, **config):
+        plugin = Plugin()
+        plugin.configure(Mock())
+        [setattr(plugin, k, v) for k, v in config.items()]
+        return plugin
+
+    def _build_message(self):
+        return ReplyEvent.build('127.0.0.1', 5000, Message.TYPE['CHECK REPLY'], [self.check], [self.contact])
+
+    def _build_plugin_manager(self, plugins):
+        return PluginManager(Mock(plugins=plugins), Mock())
+
+    def test_slow_plugin_does_not_delay_other_plugins(self):
+        slow_plugin, fast_plugin = self._build_plugin(RecordingPlugin), self._build_plugin(RecordingPlugin)
+        slow_plugin.unblock.clear()
+        plugin_manager = self._build_plugin_manager([slow_plugin, fast_plugin])
+        [w.start() for w in plugin_manager._workers]
+        plugin_manager._run_plugins(self._build_message())
+        self.assertTrue(fast_plugin.received.wait(5))
+        self.assertEqual(slow_plugin.replies, [])
+        slow_plugin.unblock.set()
+        [w.stop() for w in plugin_manager._workers]
+        self.assertEqual(slow_plugin.replies, [[self.check.snapshot()]])
+        self.assertEqual(fast_plugin.replies, [[self.check.snapshot()]])
+
+    def test_disabled_plugins_are_not_run(self):
+        plugin = self._build_plugin(RecordingPlugin, enabled=False)
+        plugin_manager = self._build_plugin_manager([plugin])
+        [w.start() for w in plugin_manager._workers]
+        plugin_manager._run_plugins(self._build_message())
+        [w.stop() for w in plugin_manager._workers]
+        self.assertEqual(plugin.replies, [])
+
+    def test_plugin_errors_are_logged(self):
+        worker = PluginWorker(self._build_plugin(FailingPlugin))
+        worker.start()
+        worker.put(ReplyEvent('127.0.0.1', 5000, Message.TYPE['CHECK REPLY'], (), ()))
+        worker.stop()
+        RadarLogger._shared_state['logger'].info.assert_called_with(
+            'Error - Plugin \'Failing plugin\' version \'0.0.1\' raised an error. Details : Failing plugin.')
+
+
+class TestPluginWorker(TestCase):
+    def setUp(self):
+        RadarLogger._shared_state['logger'] = Mock()
+        self.event = ReplyEvent('127.0.0.1', 5000, Message.TYPE['CHECK REPLY'], (), ())
+
+    def _build_plugin(self, Plugin=RecordingPlugin, **config):
+        plugin = Plugin()
+        plugin.configure(Mock())
+        [setattr(plugin, k, v) for k, v in config.items()]
+        return plugin
+
+    def _build_batch_plugin(self, **config):
+        return self._build_plugin(BatchPlugin, **config)
+
+    def test_replies_are_dropped_if_queue_is_full(self):
+        plugin = self._build_plugin(queue_size=1)
+        worker = PluginWorker(plugin)
+        self.assertTrue(worker.put(self.event))
+        self.assertFalse(worker.put(self.event))
+        self.assertFalse(worker.put(self.event))
+        self.assertEqual(worker.dropped, 2)
+        worker.start()
+        worker.stop()
+        self.assertEqual(len(plugin.replies), 1)
+        RadarLogger._shared_state['logger'].info.assert_any_call(
+            'Error - Plugin \'Recording plugin\' version \'0.0.1\' dropped 2 replies (its queue was full).')
+
+    def test_plugin_can_have_many_workers(self):
+        plugin = self._build_plugin(workers=4)
+        worker = PluginWorker(plugin)
+        worker.start()
+        [worker.put(self.event) for _ in range(10)]
+        worker.stop()
+        self.assertEqual(len(worker._threads), 4)
+        self.assertEqual(len(plugin.replies), 10)
+
+    def test_check_replies_are_delivered_in_batches(self):
+        plugin = self._build_batch_plugin(batch_size=3, batch_interval=60)
+        worker = PluginWorker(plugin)
+        [worker.put(ReplyEvent('127.0.0.1', 5000 + n, Message.TYPE['CHECK REPLY'], (n,), ())) for n in range(7)]
+        worker.start()
+        worker.stop()
+        self.assertEqual([[r.port for r in b] for b in plugin.batches], [[5000, 5001, 5002], [5003, 5004, 5005], [5006]])
+        self.assertEqual(plugin.batches[0][0], CheckReply('127.0.0.1', 5000, [0], []))
+
+    def test_pending_batch_is_delivered_after_batch_interval(self):
+        plugin = self._build_batch_plugin(batch_size=100, batch_interval=0.01)
+        worker = PluginWorker(plugin)
+        worker.start()
+        worker.put(self.event)
+        self.assertTrue(plugin.received.wait(5))
+        self.assertEqual(len(plugin.batches[0]), 1)
+        worker.stop()
+
+    # Every call to time() moves the clock a second forward, so the batch
+    # interval elapses while the queue still has replies.
+    def test_batch_interval_is_honored_while_queue_is_not_empty(self):
+        plugin = self._build_batch_plugin(batch_size=100, batch_interval=3)
+        worker = PluginWorker(plugin)
+        [worker.put(ReplyEvent('127.0.0.1', 5000 + n, Message.TYPE['CHECK REPLY'], (n,), ())) for n in range(10)]
+
+        with patch('radar.plugin.time', side_effect=count()):
+            worker.start()
+            worker.stop()
+
+        self.assertTrue(len(plugin.batches) > 1)
+        self.assertEqual([r.port for b in plugin.batches for r in b], [5000 + n for n in range(10)])
+
+    def test_test_replies_are_not_batched(self):
+        plugin = self._build_batch_plugin(batch_size=100, batch_interval=60)
+        worker = PluginWorker(plugin)
+        worker.put(ReplyEvent('127.0.0.1', 5000, Message.TYPE['TEST REPLY'], (1,), ()))
+        worker.start()
+        worker.stop()
+        self.assertEqual(plugin.tests, [[1]])
+        self.assertEqual(plugin.batches, [])
+
+    @raises(ServerPluginError)
+    def test_invalid_batch_size_raises_error(self):
+        PluginWorker(self._build_plugin(batch_size=0))
+
+    @raises(ServerPluginError)
+    def test_invalid_batch_interval_raises_error(self):
+        PluginWorker(self._build_plugin(batch_interval=0))
+
+    @raises(ServerPluginError)
+    def test_invalid_workers_raises_error(self):
+        PluginWorker(self._build_plugin(workers=0))
+
+    @raises(ServerPluginError)
+    def test_invalid_queue_size_raises_error(self):
+        PluginWorker(self._build_plugin(queue_size='many'))
+
+
+class TestReplyEvent(TestCase):
+    def setUp(self):
+        self.check = Check(id=1, name='load average', path='load-average.py')
+        self.contact = Contact(id=2, name='Lucas', email='lucas@radar.org')
+        self.event = ReplyEvent.build('127.0.0.1', 5000, Message.TYPE['CHECK REPLY'], [self.check], [self.contact])
+
+    def test_event_is_not_affected_by_later_updates(self):
+        self.check.update_status({'id': 1, 'status': Check.STATUS['OK'], 'details': 'Load is fine.'})
+        self.assertEqual(self.event.checks[0].current_status, Check.STATUS['UNKNOWN'])
+        self.assertEqual(self.event.checks[0].details, '')
+
+    def test_event_holds_check_and_contact_snapshots(self):
+        self.assertEqual(self.event.checks[0].to_dict(), self.check.to_dict())
+        self.assertEqual(self.event.contacts[0].to_dict(), self.contact.to_dict())
+
+    def test_event_can_be_rebuilt_from_a_tuple(self):
+        self.assertEqual(ReplyEvent.from_tuple(self.event.to_tuple()), self.event)
+        self.assertEqual(ReplyEvent.from_tuple(self.event.to_tuple()).checks[0].name, 'load average')
+
+
+class TestPluginProcess(TestCase):
+    def setUp(self):
+        RadarLogger._shared_state['logger'] = Mock()
+        self.plugin = ProcessPlugin()
+        self.plugin.configure(Mock())
+
+    def _build_event(self, port):
+        return ReplyEvent('127.0.0.1', port, Message.TYPE['CHECK REPLY'], (), ())
+
+    def _logged(self):
+        return [args[0] for args, _ in RadarLogger._shared_state['logger'].info.call_args_list]
+
+    def _replies(self):
+        prefix = 'Plugin \'Process plugin\' v0.0.1. '
+        return [m[len(prefix):].split() for m in self._logged() if m.startswith(prefix) and m[len(prefix):][0].isdigit()]
+
+    def _run(self, ports):
+        worker = PluginWorker(self.plugin)
+        [worker.put(self._build_event(p)) for p in ports]
+        worker.start()
+        worker.stop()
+
+    def test_plugin_is_run_in_another_process(self):
+        self._run([5000, 5001])
+        self.assertEqual([r[0] for r in self._replies()], ['5000', '5001'])
+        self.assertTrue(all([r[1] != str(getpid()) for r in self._replies()]))
+        self.assertEqual(self._logged().count('Plugin \'Process plugin\' v0.0.1. Started.'), 1)
+
+    def test_plugin_process_is_restarted_if_it_dies(self):
+        self._run([0, 5000])
+        self.assertEqual([r[0] for r in self._replies()], ['5000'])
+        self.assertEqual(self._logged().count('Plugin \'Process plugin\' v0.0.1. Started.'), 2)
+        self.assertTrue(any(['died' in m for m in self._logged()]))
+
+    def test_plugin_process_does_not_keep_server_sockets_open(self):
+        server_side, client_side = socketpair()
+        process = PluginProcess(ProcessPlugin)
+        server_side.close()
+        client_side.settimeout(5)
+        self.assertEqual(client_side.recv(1), b'')
+        client_side.close()
+        process.stop()
+
+    def test_plugin_is_not_started_in_this_process(self):
+        self.assertEqual(self._logged(), ['Loading plugin : \'Process plugin\' v0.0.1.'])
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of Radar.
+
+Radar is free software: you can redistribute it and/or modify
+it under the terms of the GNU Lesser General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Radar is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+Lesser GNU General Public License for more details.
+
+You should have received a copy of the Lesser GNU General Public License
+along with Radar. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright 2015 Lucas Liendo.
+"""
+
+
+from unittest import TestCase
+from radar.check import Check, CheckGroup
+from radar.scheduler import PollScheduler
+
+
+class TestPollScheduler(TestCase):
+    def setUp(self):
+        self.fast_check = Check(name='fast', path='fast.py', interval=30)
+        self.slow_check = Check(name='slow', path='slow.py', interval=3600)
+        self.default_check = Check(name='default', path='default.py')
+        self.scheduler = PollScheduler([self.fast_check, self.slow_check, self.default_check], 300, 0)
+
+    def test_all_checks_are_due_at_start(self):
+        self.assertEqual(set(self.scheduler.pop_due(0)[0]), set([self.fast_check, self.slow_check, self.default_check]))
+
+    def test_checks_are_polled_on_their_own_interval(self):
+        self.scheduler.pop_due(0)
+        self.assertEqual(self.scheduler.next_poll_time(), 30)
+        self.assertEqual(self.scheduler.pop_due(29), {})
+        self.assertEqual(self.scheduler.pop_due(30), {0: [self.fast_check]})
+        polled = [c for t in range(60, 3601, 30) for c in self.scheduler.pop_due(t).get(0, [])]
+        self.assertEqual(polled.count(self.fast_check), 119)
+        self.assertEqual(polled.count(self.default_check), 12)
+        self.assertEqual(polled.count(self.slow_check), 1)
+
+    def test_check_is_not_polled_repeatedly_after_falling_behind(self):
+        self.scheduler.pop_due(0)
+        self.assertEqual(self.scheduler.pop_due(1000)[0].count(self.fast_check), 1)
+        self.assertEqual(self.scheduler.next_poll_time(), 1030)
+
+    def test_jitter_does_not_shift_cadence(self):
+        check = Check(name='jittered', path='jittered.py', interval=10, jitter=5)
+        scheduler = PollScheduler([check], 300, 0)
+
+        for n in range(1, 50):
+            scheduler.pop_due(scheduler.next_poll_time())
+            self.assertTrue(10 * n <= scheduler.next_poll_time() <= 10 * n + 5)
+
+    def test_check_groups_are_scheduled(self):
+        check_group = CheckGroup(name='group', checks=[self.default_check], interval=60)
+        scheduler = PollScheduler([check_group], 300, 0)
+        scheduler.pop_due(0)
+        self.assertEqual(scheduler.pop_due(60), {0: [check_group]})
+
+    def test_slots_are_spread_across_the_interval(self):
+        scheduler = PollScheduler([self.default_check], 300, 0, slots=3)
+        self.assertEqual(scheduler.pop_due(0), {0: [self.default_check]})
+        self.assertEqual(scheduler.pop_due(100), {1: [self.default_check]})
+        self.assertEqual(scheduler.pop_due(200), {2: [self.default_check]})
+        self.assertEqual(scheduler.pop_due(300), {0: [self.default_check]})
+
+    def test_slots_are_spread_across_each_check_interval(self):
+        scheduler = PollScheduler([self.fast_check], 300, 0, slots=3)
+        scheduler.pop_due(0)
+        self.assertEqual(scheduler.pop_due(10), {1: [self.fast_check]})
+        self.assertEqual(scheduler.pop_due(20), {2: [self.fast_check]})
+
+    def test_client_slot_is_stable(self):
+        slot = PollScheduler.get_slot('192.168.0.1', 10)
+        self.assertTrue(0 <= slot < 10)
+        self.assertEqual(PollScheduler.get_slot('192.168.0.1', 10), slot)
+        self.assertEqual(PollScheduler.get_slot('192.168.0.1', 1), 0)
@@ -23,105 +23,207 @@ Copyright 2015 Lucas Liendo.
 from unittest import TestCase
 from nose.tools import raises
 from mock import MagicMock
-from struct import pack, unpack, calcsize
-from io import BytesIO
+from struct import pack, unpack
+from zlib import compress
 from radar.protocol import Message, MessageNotReady
-from radar.network.client import ClientAbortError
+from radar.network.client import ClientAbortError, ClientDataNotReady
 
 
 class TestRadarProtocol(TestCase):
     def setUp(self):
         self.client = MagicMock()
 
-    def _mock_receive(self, side_effect):
-        self.client.receive = MagicMock(side_effect=side_effect)
+    def tearDown(self):
+        Message.configure()
+
+    def _mock_receive(self, chunks):
+        chunks = list(chunks)
+
+        def receive_into(buffer):
+            if not chunks:
+                raise ClientDataNotReady()
+
+            chunk = chunks.pop(0)
+            received_bytes = min(len(chunk), len(buffer))
+            buffer[:received_bytes] = chunk[:received_bytes]
+
+            if received_bytes < len(chunk):
+                chunks.insert(0, chunk[received_bytes:])
+
+            return received_bytes
+
+        self.client.receive_into = MagicMock(side_effect=receive_into)
 
     def _mock_send(self, side_effect):
         self.client.send = MagicMock(side_effect=side_effect)
 
-    def _receive_header(self, message, header_format):
-        try:
-            message._receive_header(self.client)
-        except MessageNotReady:
-            self.assertEqual(message.header.tell(), calcsize(header_format))
+    def _pack(self, message_type, message_options, payload):
+        return pack('!BBH', message_type, message_options, len(payload)) + payload
+
+    def _receive(self, message, message_type, message_options, payload=b''):
+        self._mock_receive([self._pack(message_type, message_options, payload)])
+        return message.receive(self.client)
+
+    def _receive_until_ready(self, message, receptions):
+        for _ in range(receptions - 1):
+            try:
+                message.receive(self.client)
+                self.fail('Message received before being complete.')
+            except MessageNotReady:
+                pass
 
-        return message.header.getvalue()
+        return message.receive(self.client)
 
-    def test_header_reception(self):
+    def test_fragmented_header_reception(self):
         message = Message()
         self._mock_receive([
             pack('!B', Message.TYPE['CHECK']),
             pack('!B', Message.OPTIONS['NONE']),
             pack('!H', 2),
+            b'{}',
         ])
 
-        self.assertEqual(
-            unpack('!B', self._receive_header(message, '!B')),
-            (Message.TYPE['CHECK'],)
-        )
-        self.assertEqual(
-            unpack('!BB', self._receive_header(message, '!BB')),
-            (Message.TYPE['CHECK'], Message.OPTIONS['NONE'], )
-        )
-        self.assertEqual(
-            unpack('!BBH', self._receive_header(message, '!BBH')),
-            (Message.TYPE['CHECK'], Message.OPTIONS['NONE'], 2)
-        )
-
-    def _receive(self, message, message_type, message_options, payload=''):
-        self._mock_receive([
-            pack('!BBH', message_type, message_options, len(payload)),
-            pack('!{:}s'.format(len(payload)), payload)
-        ])
-        return message.receive(self.client)
+        message_type, payload = self._receive_until_ready(message, 4)
+        self.assertEqual(message_type, Message.TYPE['CHECK'])
+        self.assertEqual(payload.tobytes(), b'{}')
+
+    def test_get_type(self):
+        [self.assertEqual(Message.get_type(v), k) for k, v in Message.TYPE.items()]
 
     @raises(ClientAbortError)
     def test_receive_raises_error_due_to_invalid_message_type(self):
         message = Message()
-        self._receive(message, max(Message.TYPE.values()) + 1, Message.OPTIONS['NONE'])
+        self._receive(message, max(Message.TYPE.values()) + 1, Message.OPTIONS['NONE'], b'{}')
 
     @raises(ClientAbortError)
     def test_invalid_header_due_to_invalid_message_option(self):
         message = Message()
-        self._receive(message, Message.TYPE['CHECK'], max(Message.OPTIONS.values()) + 1)
+        self._receive(message, Message.TYPE['CHECK'], max(Message.OPTIONS.values()) + 1, b'{}')
 
     @raises(ClientAbortError)
     def test_invalid_header_due_to_invalid_message_length(self):
         message = Message()
-        self._receive(message, Message.TYPE['CHECK'], max(Message.OPTIONS.values()) + 1)
+        self._receive(message, Message.TYPE['CHECK'], Message.OPTIONS['NONE'])
+
+    @raises(MessageNotReady)
+    def test_receive_raises_error_if_no_data_is_available(self):
+        message = Message()
+        self._mock_receive([])
+        message.receive(self.client)
 
     def test_payload_reception(self):
         message = Message()
-        message_type, payload = self._receive(message, Message.TYPE['CHECK'], Message.OPTIONS['NONE'], '{}')
+        message_type, payload = self._receive(message, Message.TYPE['CHECK'], Message.OPTIONS['NONE'], b'{}')
         self.assertEqual(message_type, Message.TYPE['CHECK'])
-        self.assertEqual(payload, '{}')
-        self.assertEqual(message.header.getvalue(), BytesIO().getvalue())
-        self.assertEqual(message.payload.getvalue(), BytesIO().getvalue())
+        self.assertEqual(payload.tobytes(), b'{}')
 
     def test_fragmented_payload_reception(self):
         message = Message()
         self._mock_receive([
             pack('!BBH', Message.TYPE['CHECK'], Message.OPTIONS['NONE'], 3),
-            pack('!1s', '{'),
-            pack('!1s', ' '),
-            pack('!1s', '}'),
+            b'{',
+            b' ',
+            b'}',
         ])
 
-        try:
-            message.receive(self.client)
-        except MessageNotReady:
-            pass
+        message_type, payload = self._receive_until_ready(message, 4)
+        self.assertEqual(message_type, Message.TYPE['CHECK'])
+        self.assertEqual(payload.tobytes(), b'{ }')
 
-        try:
-            message.receive(self.client)
-        except MessageNotReady:
-            pass
+    def test_all_messages_are_received_at_once(self):
+        message = Message()
+        payloads = [b'[1]', b'[2]', b'[3]']
+        self._mock_receive([b''.join([self._pack(Message.TYPE['CHECK REPLY'], Message.OPTIONS['NONE'], p) for p in payloads])])
+        messages = message.receive_messages(self.client)
+        self.assertEqual([p.tobytes() for _, p in messages], payloads)
+        self.assertEqual(self.client.receive_into.call_count, 1)
 
-        message_type, payload = message.receive(self.client)
-        self.assertEqual(message_type, Message.TYPE['CHECK'])
-        self.assertEqual(payload, '{ }')
+    def test_buffered_message_is_received_without_reading(self):
+        message = Message()
+        packed_message = self._pack(Message.TYPE['CHECK'], Message.OPTIONS['NONE'], b'{}')
+        self._mock_receive([packed_message + packed_message])
+        message.receive(self.client)
+        _, payload = message.receive(self.client)
+        self.assertEqual(payload.tobytes(), b'{}')
+        self.assertEqual(self.client.receive_into.call_count, 1)
+
+    def test_message_larger_than_receive_buffer(self):
+        message = Message()
+        payload = b'x' * (3 * Message.RECEIVE_BUFFER_SIZE)
+        packed_message = self._pack(Message.TYPE['CHECK'], Message.OPTIONS['NONE'], payload)
+        chunk_size = Message.RECEIVE_BUFFER_SIZE // 2
+        self._mock_receive([packed_message[n:n + chunk_size] for n in range(0, len(packed_message), chunk_size)])
+        _, received_payload = self._receive_until_ready(message, len(range(0, len(packed_message), chunk_size)))
+        self.assertEqual(received_payload.tobytes(), payload)
+
+    def test_messages_split_across_receptions(self):
+        message = Message()
+        payloads = [pack('!{:}s'.format(n), b'x' * n) for n in range(1, 3000, 7)]
+        stream = b''.join([self._pack(Message.TYPE['CHECK REPLY'], Message.OPTIONS['NONE'], p) for p in payloads])
+        self._mock_receive([stream[n:n + 1000] for n in range(0, len(stream), 1000)])
+        received_payloads = []
+
+        while len(received_payloads) < len(payloads):
+            try:
+                received_payloads += [p.tobytes() for _, p in message.receive_messages(self.client)]
+            except MessageNotReady:
+                pass
+
+        self.assertEqual(received_payloads, payloads)
 
     def test_send(self):
         message = Message()
         self._mock_send([4, 1, 1])
-        self.assertEqual(message.send(self.client, Message.TYPE['CHECK'], '{}'), 6)
+        self.assertEqual(message.send(self.client, Message.TYPE['CHECK'], b'{}'), 6)
+
+    def test_send_packed_message(self):
+        packed_message = Message.pack(Message.TYPE['CHECK'], b'{}')
+        self.assertEqual(packed_message, self._pack(Message.TYPE['CHECK'], Message.OPTIONS['NONE'], b'{}'))
+        self._mock_send(lambda data: len(data))
+        self.assertEqual(Message().send_packed(self.client, packed_message), 6)
+        self.client.send.assert_called_once_with(packed_message)
+
+    def _sent_message(self, message_type, payload):
+        self._mock_send(lambda data: len(data))
+        message = Message()
+        message.send(self.client, message_type, payload)
+        return self.client.send.call_args[0][0]
+
+    def test_send_compresses_message_beyond_threshold(self):
+        Message.configure(compress=True, compress_threshold=10)
+        payload = b'[' + b'0, ' * 100 + b'0]'
+        sent_message = self._sent_message(Message.TYPE['CHECK REPLY'], payload)
+        _, message_options, payload_size = unpack('!BBH', sent_message[:4])
+        self.assertEqual(message_options, Message.OPTIONS['COMPRESS'])
+        self.assertEqual(sent_message[4:], compress(payload))
+        self.assertEqual(payload_size, len(compress(payload)))
+
+    def test_send_does_not_compress_message_under_threshold(self):
+        Message.configure(compress=True, compress_threshold=10)
+        sent_message = self._sent_message(Message.TYPE['CHECK REPLY'], b'[]')
+        self.assertEqual(unpack('!BBH', sent_message[:4])[1], Message.OPTIONS['NONE'])
+
+    def test_send_does_not_compress_if_disabled(self):
+        payload = b'[' + b'0, ' * 100 + b'0]'
+        sent_message = self._sent_message(Message.TYPE['CHECK REPLY'], payload)
+        self.assertEqual(unpack('!BBH', sent_message[:4])[1], Message.OPTIONS['NONE'])
+        self.assertEqual(sent_message[4:], payload)
+
+    def test_compressed_payload_reception(self):
+        message = Message()
+        payload = b'[' + b'0, ' * 100 + b'0]'
+        message_type, received_payload = self._receive(
+            message, Message.TYPE['CHECK REPLY'], Message.OPTIONS['COMPRESS'], compress(payload))
+        self.assertEqual(message_type, Message.TYPE['CHECK REPLY'])
+        self.assertEqual(received_payload.tobytes(), payload)
+
+    @raises(ClientAbortError)
+    def test_compressed_payload_beyond_max_decompressed_size_raises_error(self):
+        message = Message()
+        payload = b'0' * (Message.MAX_DECOMPRESSED_SIZE + 1)
+        self._receive(message, Message.TYPE['CHECK REPLY'], Message.OPTIONS['COMPRESS'], compress(payload))
+
+    @raises(ClientAbortError)
+    def test_invalid_compressed_payload_raises_error(self):
+        message = Message()
+        self._receive(message, Message.TYPE['CHECK REPLY'], Message.OPTIONS['COMPRESS'], b'not compressed')